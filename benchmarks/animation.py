@@ -0,0 +1,117 @@
+"""
+Measures decoding of long packed animation clips.
+
+Usage: python benchmarks/animation.py [--frames 20000] [--nodes 32]
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.animation import OdinAnimation
+from lib.animation.flags import OdinAnimationFlags
+from lib.animation.packedReader import OdinPackedReader
+from tests.reference import scalar_denormalize_transforms
+
+# Flags of benchmark nodes are taken one after another
+NodeFlags = [2 | 4 | 8, 2 | 4 | 8 | 16, 2, 4, 8 | 16, 2 | 4]
+
+
+class PackedClip:
+    """Fixed stride packed animation with random values. Provides accessors the same way as glTF does"""
+
+    def __init__(self, frame_count: int, node_count: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.workers = None
+
+        flags = [OdinAnimationFlags(NodeFlags[i % len(NodeFlags)]) for i in range(node_count)]
+        frame_stride = sum(flag.elements_count for flag in flags)
+
+        base = rng.normal(size=(node_count, 12)).astype(np.float32)
+        base[:, 10:] = np.abs(base[:, 10:]) * 0.01
+
+        self.accessors = [
+            rng.integers(-32767, 32768, size=frame_count * frame_stride).astype(np.int16),
+            base.reshape(-1)
+        ]
+        self.descriptor = {"frameRate": 30, "keyframesCount": frame_count, "packed": {
+            "nodes": [
+                {"nodeIndex": i, "flags": flag.flags, "frameCount": frame_count,
+                 "dataSize": frame_count * flag.elements_count}
+                for i, flag in enumerate(flags)
+            ],
+            "dataAccessor": 0,
+            "nodeAccessor": 1
+        }}
+
+    def decode_accessor(self, index: int) -> np.array:
+        return self.accessors[index]
+
+
+def measure(function, repeat: int = 1) -> float:
+    """Returns the best time of function call in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def benchmark_denormalize(frame_count: int) -> None:
+    rng = np.random.default_rng(1)
+    print(f"Denormalization of single node, {frame_count} frames")
+
+    for flags in NodeFlags:
+        flags = OdinAnimationFlags(flags)
+        node = (
+            (np.array([rng.random() * 0.01], dtype=np.float32), np.array([rng.random() * 0.001], dtype=np.float32)),
+            *[[np.array([value], dtype=np.float32) for value in rng.normal(size=count)] for count in (3, 4, 3)],
+            *[rng.integers(-32767, 32768, size=(count, frame_count)).astype(np.int16) for count in (3, 4, 3)]
+        )
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            start = time.perf_counter()
+            expected = scalar_denormalize_transforms(frame_count, flags, *node)
+            scalar_time = time.perf_counter() - start
+
+        result = OdinPackedReader.denormalize_transforms(None, frame_count, flags, *node)
+        vector_time = measure(lambda: OdinPackedReader.denormalize_transforms(
+            None, frame_count, flags, *node), 5)
+
+        identical = np.array_equal(result.view(np.uint32), expected.view(np.uint32))
+        print(f"  flags {flags.flags:2}: scalar {scalar_time:8.3f} s, vectorized {vector_time * 1000:8.3f} ms, "
+              f"bit-identical: {identical}")
+
+
+def benchmark_clip(frame_count: int, node_count: int) -> None:
+    clip = PackedClip(frame_count, node_count)
+    print(f"Decoding of clip with {node_count} nodes, {frame_count} frames")
+
+    eager_time = measure(lambda: OdinAnimation.Create(clip, clip.descriptor), 3)
+    print(f"  all nodes: {eager_time * 1000:.1f} ms")
+
+    def decode_lazy():
+        reader = OdinAnimation.Create(clip, clip.descriptor, lazy=True)
+        for i in range(node_count):
+            reader.get_node_data(i)
+            reader.release_node(i)
+
+    lazy_time = measure(decode_lazy, 3)
+    print(f"  node by node with release: {lazy_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Packed animation decoding benchmark")
+    parser.add_argument("--frames", type=int, default=20000, help="Frames count of clip")
+    parser.add_argument("--nodes", type=int, default=32, help="Nodes count of clip")
+    args = parser.parse_args()
+
+    benchmark_denormalize(args.frames)
+    benchmark_clip(args.frames, args.nodes)
@@ -5,24 +5,27 @@ from lib.animation.continuousPackedReader import OdinContinuousPackedReader
 
 class OdinAnimation:
     @staticmethod
-    def CreatePackedReader(gltf, descriptor: dict) -> OdinPackedReader:
+    def CreatePackedReader(gltf, descriptor: dict, lazy: bool = False) -> OdinPackedReader:
         packed: dict = descriptor.get("packed")
         if (packed.get("uintAccessor") is not None):
-            return OdinContinuousPackedReader(gltf, descriptor)
+            return OdinContinuousPackedReader(gltf, descriptor, lazy)
         
-        return OdinPackedReader(gltf, descriptor)
+        return OdinPackedReader(gltf, descriptor, lazy)
     
     @staticmethod
-    def Create(gltf, descriptor: dict) -> OdinAnimationReader:
+    def Create(gltf, descriptor: dict, lazy: bool = False) -> OdinAnimationReader:
+        """Creates reader of animation. Lazy reader decodes node data only when it is requested and can release it afterwards"""
         result = None
         if (descriptor.get("nodes") is not None and descriptor.get("accessor") is not None):
             result = OdinRawAnimationReader(gltf, descriptor)
         
         if (descriptor.get("packed") is not None):
-            result = OdinAnimation.CreatePackedReader(gltf, descriptor)
+            result = OdinAnimation.CreatePackedReader(gltf, descriptor, lazy)
         
         if (result is None):
             raise NotImplementedError("Unknown animation data")
         
-        result.read()
+        if (not lazy):
+            result.read()
+
         return result
\ No newline at end of file
@@ -1,115 +1,184 @@
-from typing import List
+from typing import List, Tuple
 from lib.animation.flags import OdinAnimationFlags
 from lib.animation.packedReader import OdinPackedReader
-from lib.animation.packedReader import TranslationChannels, RotationChannels, ScaleChannels
+from lib.animation.packedReader import RotationChannels
+from threading import Lock
 import numpy as np
 
 
 class OdinContinuousPackedReader(OdinPackedReader):
-    def __init__(self, gltf, animation):
-        super().__init__(gltf, animation)
+    def __init__(self, gltf, animation, lazy: bool = False):
+        super().__init__(gltf, animation, lazy)
 
         self.rotation_data = None
         rotation_accessor_idx = self.descriptor.get("uintAccessor")
         if (rotation_accessor_idx is not None):
-            self.rotation_counter = 0
-            self.rotation_data = gltf.decode_accessor(rotation_accessor_idx)
+            self.rotation_data = gltf.decode_accessor(
+                rotation_accessor_idx).reshape(-1)
             self.stride = 8
 
-        self.elements_counter = 0
-
-    def read_normalized_transforms(self, frame_count: int, flags: OdinAnimationFlags):
-        rotation = [
-            np.zeros((frame_count), dtype=np.int16)
-            for _ in range(RotationChannels)
-        ] if flags.has_rotation else None
-
-        translation = [
-            np.zeros((frame_count), dtype=np.int16)
-            for _ in range(TranslationChannels)
-        ] if flags.has_translation else None
-
-        scale = [
-            np.zeros((frame_count), dtype=np.int16)
-            for _ in range(ScaleChannels)
-        ] if (flags.has_scale or flags.has_separate_scale) else None
-
-        if (not flags.has_transform):
-            return (translation, rotation, scale)
-
+        # Runs of frames of each node, see scan_node_runs. Counters are scanned once before first node is decoded
+        self.node_runs: List[tuple | None] | None = None
+        self.node_runs_lock = Lock()
+
+        # Frames of each node which are not repeats of previous frame
+        self.key_frames: List[np.ndarray | None] = [None] * len(self.nodes)
+
+    def validate_node_offsets(self, data_size: int) -> None:
+        # Offsets are known only after counters are scanned, each node is checked against its data size there
+        pass
+
+    def create_node_runs(self) -> None:
+        """
+        Scans counters of all node streams to find offset of each node.
+        Only counters are read here, so after that nodes can be decoded independently
+        """
+        node_runs = []
+        self.node_offsets = []
+
+        offset = 0
+        for node, flags in zip(self.nodes, self.flags):
+            self.node_offsets.append(offset)
+            if (not flags.has_transform):
+                node_runs.append(None)
+                continue
+
+            runs, offset = self.scan_node_runs(
+                offset, node.get("frameCount"), node.get("dataSize"), flags)
+            node_runs.append(runs)
+
+        self.node_runs = node_runs
+
+    def scan_node_runs(self, offset: int, frame_count: int, data_size: int, flags: OdinAnimationFlags) -> Tuple[tuple, int]:
+        """
+        Scans repeat and keyframe counters to build runs of frames.
+        Each run is a segment of frames which takes values from keyframes starting from specific one.
+        Keyframe runs take next keyframe for every frame, repeat runs take the latest keyframe for all frames
+
+        :return: Runs and offset of the next node
+        """
+        elements_count = flags.layout.elements_count
+        data_end = offset + data_size
+
+        def read_counter() -> int:
+            nonlocal offset
+            if (offset >= data_end):
+                raise Exception("Transform index exceeded data size limit")
+
+            offset += 1
+            return int(self.normalized_transform_data[offset - 1])
+
+        keyframe_offsets: list[int] = []
+        keyframe_runs: list[int] = []
+        run_lengths: list[int] = []
+        run_sources: list[int] = []
+        run_steps: list[int] = []
+
+        keyframes_total = 0
         frame_index = 0
         while (frame_count > frame_index):
             if (frame_index != 0):
-                repeat_keyframe_count = int(self.read_normalized_value())
-
                 # For some reason repeat count for latest frame is negative (some kind of optimization?)
-                repeat_keyframe_count = abs(repeat_keyframe_count)
-
-                # Repeat latest transforms for all transform channels
-                for _ in range(repeat_keyframe_count):
-                    if (flags.has_rotation):
-                        for i in range(RotationChannels):
-                            rotation[i][frame_index] = rotation[i][frame_index - 1]
+                repeat_keyframe_count = abs(read_counter())
+                repeat_keyframe_count = min(
+                    repeat_keyframe_count, frame_count - frame_index)
 
-                    if (flags.has_translation):
-                        for i in range(TranslationChannels):
-                            translation[i][frame_index] = translation[i][frame_index - 1]
-
-                    if (flags.has_scale or flags.has_separate_scale):
-                        for i in range(ScaleChannels):
-                            scale[i][frame_index] = scale[i][frame_index - 1]
-
-                    frame_index += 1
+                if (repeat_keyframe_count):
+                    run_lengths.append(repeat_keyframe_count)
+                    run_sources.append(keyframes_total - 1)
+                    run_steps.append(0)
+                    frame_index += repeat_keyframe_count
 
             if (frame_index >= frame_count):
                 break
 
-            keyframes_count = int(self.read_normalized_value())
-            for _ in range(keyframes_count):
-                # if (not flags.has_frametime):
-                #    self.transform_index = (self.frame_stride * frame_index) + node_elements_counter
-
-                if (flags.has_frametime):
-                    # Skip for now. Idk why it exist at all. Maybe for compatibility with gltf animations
-                    frametime = self.read_normalized_value()
-
-                if (flags.has_rotation):
-                    for i in range(RotationChannels):
-                        rotation[i][frame_index] = self.read_normalized_value()
+            keyframes_count = read_counter()
+            if (offset + keyframes_count * elements_count > data_end):
+                raise Exception("Transform index exceeded data size limit")
 
-                if (flags.has_translation):
-                    for i in range(TranslationChannels):
-                        translation[i][frame_index] = self.read_normalized_value()
+            keyframe_offsets.append(offset)
+            keyframe_runs.append(keyframes_count)
+            offset += keyframes_count * elements_count
 
-                if (flags.has_scale and flags.has_separate_scale):
-                    for i in range(ScaleChannels):
-                        scale[i][frame_index] = self.read_normalized_value()
-                elif (flags.has_scale):
-                    value = self.read_normalized_value()
-                    for i in range(ScaleChannels):
-                        scale[i][frame_index] = value
+            keyframes_count = min(keyframes_count, frame_count - frame_index)
+            if (keyframes_count):
+                run_lengths.append(keyframes_count)
+                run_sources.append(keyframes_total)
+                run_steps.append(1)
+                frame_index += keyframes_count
 
-                frame_index += 1
+            keyframes_total += keyframe_runs[-1]
 
-        self.elements_counter = 0
-        return (translation, rotation, scale)
+        return (keyframe_offsets, keyframe_runs, run_lengths, run_sources, run_steps), offset
 
-    def read_normalized_value(self) -> int | float:
-        result = self.normalized_transform_data[self.transform_index]
-        self.transform_index += 1
-        if (self.elements_counter >= self.data_size):
-            raise Exception("Transform index exceeded data size limit")
-
-        self.elements_counter += 1
-        return result
-
-    def read_base_rotation(self) -> List[int]:
+    def read_normalized_transforms(self, node_index: int, frame_count: int, flags: OdinAnimationFlags):
+        if (not flags.has_transform):
+            return (None, None, None)
+
+        layout = flags.layout
+        elements_count = layout.elements_count
+        keyframe_offsets, keyframe_runs, run_lengths, run_sources, run_steps = self.node_runs[
+            node_index]
+
+        # Step 1. Gathering all keyframes values to (keyframes, elements) block
+        keyframe_runs = np.array(keyframe_runs, dtype=np.int64)
+        keyframe_first = np.cumsum(keyframe_runs) - keyframe_runs
+        keyframe_starts = np.repeat(np.array(
+            keyframe_offsets, dtype=np.int64) - keyframe_first * elements_count, keyframe_runs)
+        keyframe_starts += np.arange(int(keyframe_runs.sum())) * elements_count
+        keyframes = self.normalized_transform_data[keyframe_starts[:, None] + np.arange(
+            elements_count)]
+
+        # Step 2. Expanding runs to frames
+        run_lengths = np.array(run_lengths, dtype=np.int64)
+        run_offsets = np.cumsum(run_lengths) - run_lengths
+        run_steps = np.repeat(np.array(run_steps, dtype=np.int64), run_lengths)
+        frame_sources = np.repeat(np.array(run_sources, dtype=np.int64), run_lengths) + (
+            np.arange(frame_count) - np.repeat(run_offsets, run_lengths)) * run_steps
+
+        # Repeated frames follow frame of keyframe which they hold, even if repeat runs are split by empty keyframe runs
+        if (layout.frametime_offset is not None):
+            frame_indices = np.arange(frame_count)
+            held_frames = np.maximum.accumulate(np.where(run_steps == 1, frame_indices, 0))
+            self.frame_times[node_index] = self.create_frame_times(
+                keyframes[frame_sources, layout.frametime_offset].astype(np.int64) + frame_indices - held_frames)
+
+        # Last frame of repeat run is kept too so linear interpolation holds value until next keyframe
+        key_frames = run_steps == 1
+        key_frames[run_offsets + run_lengths - 1] = True
+        self.key_frames[node_index] = np.flatnonzero(key_frames)
+
+        return self.split_normalized_transforms(keyframes[frame_sources], frame_count, flags)
+
+    def read_base_transform(self, node_index: int) -> Tuple[np.array, np.array, np.array, float, float]:
         if (self.rotation_data is None):
-            return super().read_base_rotation()
-
-        result = [
-            self.rotation_data[self.rotation_counter + i]
-            for i in range(RotationChannels)
-        ]
-        self.rotation_counter += RotationChannels
-        return result
+            return super().read_base_transform(node_index)
+
+        # Rotation is stored in separate accessor
+        base = self.node_base_data[node_index *
+                                   self.stride:(node_index + 1) * self.stride]
+        rotation = self.rotation_data[node_index *
+                                      RotationChannels:(node_index + 1) * RotationChannels]
+
+        return (
+            base[0:3],
+            rotation,
+            base[3:6],
+            base[6],
+            base[7]
+        )
+
+    def decode_node(self, node_index: int) -> None:
+        with self.node_runs_lock:
+            if (self.node_runs is None):
+                self.create_node_runs()
+
+        return super().decode_node(node_index)
+
+    def release_node(self, node_index: int) -> None:
+        super().release_node(node_index)
+        self.key_frames[node_index] = None
+
+    def get_node_key_frames(self, node_index: int) -> np.ndarray | None:
+        self.load_node(node_index)
+        return self.key_frames[node_index]
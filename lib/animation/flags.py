@@ -1,8 +1,55 @@
+from lib.animation.store import TranslationChannel, RotationChannel, ScaleChannel
+
+
+class OdinAnimationFlagsLayout:
+    """Layout of per frame elements of node with specific flags. Offsets of channels which are not stored are None"""
+
+    def __init__(self, flags: int):
+        self.channels = 0
+        self.frametime_offset: int | None = None
+        self.rotation_offset: int | None = None
+        self.translation_offset: int | None = None
+        self.scale_offset: int | None = None
+
+        # Count of stored scale values. Single value is used for all axes
+        self.scale_count = 0
+
+        counter = 0
+        if (flags & 1):
+            self.frametime_offset = counter
+            counter += 1
+        if (flags & 2):
+            self.channels |= RotationChannel
+            self.rotation_offset = counter
+            counter += 4
+        if (flags & 4):
+            self.channels |= TranslationChannel
+            self.translation_offset = counter
+            counter += 3
+        if (flags & 8):
+            self.scale_offset = counter
+            self.scale_count = 3 if flags & 16 else 1
+            counter += self.scale_count
+
+        # Separate scale flag without scale still marks scale as animated
+        if (flags & (8 | 16)):
+            self.channels |= ScaleChannel
+
+        self.elements_count = counter
+
+
+# Layouts of all possible flag combinations
+OdinAnimationFlagsLayouts = [OdinAnimationFlagsLayout(flags) for flags in range(32)]
+
 
 class OdinAnimationFlags:
     def __init__(self, flags=0):
         self.flags = flags
 
+    @property
+    def layout(self) -> OdinAnimationFlagsLayout:
+        return OdinAnimationFlagsLayouts[self.flags & 31]
+
     @property
     def has_transform(self) -> bool:
         return self.flags != 0
@@ -29,16 +76,4 @@ class OdinAnimationFlags:
 
     @property
     def elements_count(self) -> int:
-        counter = 0
-        if (self.has_frametime):
-            counter += 1
-        if (self.has_rotation):
-            counter += 4
-        if (self.has_translation):
-            counter += 3
-        if (self.has_separate_scale and self.has_scale):
-            counter += 3
-        elif (self.has_scale):
-            counter += 1
-
-        return counter
+        return self.layout.elements_count
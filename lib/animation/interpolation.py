@@ -0,0 +1,74 @@
+import numpy as np
+
+# Interpolation of animation samplers as described in glTF specification
+# https://registry.khronos.org/glTF/specs/2.0/glTF-2.0.html#interpolation-slerp
+
+
+def lerp(a: np.array, b: np.array, t: np.array) -> np.array:
+    """Linear interpolation of (count, components) arrays with (count, ) factors"""
+    t = t[:, None]
+    return a * (1.0 - t) + b * t
+
+
+def slerp(a: np.array, b: np.array, t: np.array) -> np.array:
+    """Spherical linear interpolation of (count, 4) quaternion arrays with (count, ) factors"""
+    dot = np.sum(a * b, axis=1)
+
+    # Shortest path
+    b = np.where((dot < 0)[:, None], -b, b)
+    dot = np.abs(dot)
+
+    # Almost identical quaternions are interpolated linearly to avoid division by zero
+    angle = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_angle = np.sin(angle)
+    linear = sin_angle < 1e-6
+    sin_angle = np.where(linear, 1.0, sin_angle)
+
+    a_weight = np.where(linear, 1.0 - t, np.sin((1.0 - t) * angle) / sin_angle)
+    b_weight = np.where(linear, t, np.sin(t * angle) / sin_angle)
+
+    return a * a_weight[:, None] + b * b_weight[:, None]
+
+
+# Interpolation function of each animation channel path
+PathInterpolation = {
+    "translation": lerp,
+    "rotation": slerp,
+    "scale": lerp,
+}
+
+
+def resample(values: np.array, positions: np.array, interpolate) -> np.array:
+    """Samples curve defined by keys of uniform frames at fractional frame positions"""
+    if len(values) < 2:
+        return np.repeat(values[:1], len(positions), axis=0)
+
+    index = np.clip(np.floor(positions).astype(np.int64), 0, len(values) - 2)
+    factor = np.clip(positions - index, 0.0, 1.0)
+
+    return interpolate(values[index].astype(np.float64), values[index + 1].astype(np.float64), factor)
+
+
+def resample_positions(frame_count: int, frame_rate: float, target_frame_rate: float) -> np.array:
+    """Returns fractional frame positions of frames with target rate which cover all frames, including the last one"""
+    step = frame_rate / target_frame_rate
+    last_frame = frame_count - 1
+
+    positions = np.arange(int(np.floor(last_frame / step + 1e-6)) + 1, dtype=np.float64) * step
+    if positions[-1] < last_frame:
+        positions = np.append(positions, float(last_frame))
+
+    return positions
+
+
+def resample_time_positions(times: np.array, target_frame_rate: float) -> np.array:
+    """Returns fractional positions of keys with non-uniform times which are sampled with target rate, including the last key"""
+    times = np.asarray(times, dtype=np.float64)
+    duration = times[-1] - times[0]
+
+    sample_times = times[0] + np.arange(
+        int(np.floor(duration * target_frame_rate + 1e-6)) + 1, dtype=np.float64) / target_frame_rate
+    if sample_times[-1] < times[-1]:
+        sample_times = np.append(sample_times, times[-1])
+
+    return np.interp(sample_times, times, np.arange(len(times), dtype=np.float64))
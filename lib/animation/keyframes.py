@@ -0,0 +1,116 @@
+from lib.animation.interpolation import lerp, slerp
+import numpy as np
+
+
+def reduce_hold_keys(frames: np.array, values: np.array) -> np.array:
+    """
+    Removes keys which are equal to both neighbour keys. Such keys are inside of hold segment
+    and are restored by linear interpolation exactly.
+
+    :param frames: Indices of frames which hold keyframes, frames between them repeat previous keyframe
+    :param values: Values of all frames with (frames, components) shape
+    :return: Indices of frames which must be kept
+    """
+    if len(frames) < 3:
+        return frames
+
+    keys = values[frames]
+    same_as_previous = (keys[1:-1] == keys[:-2]).all(axis=1)
+    same_as_next = (keys[1:-1] == keys[2:]).all(axis=1)
+
+    keep = np.ones(len(frames), dtype=bool)
+    keep[1:-1] = ~(same_as_previous & same_as_next)
+    return frames[keep]
+
+
+def translation_error(value: np.array, reference: np.array) -> np.array:
+    """Distance between positions in units"""
+    return np.linalg.norm(value - reference, axis=1)
+
+
+def rotation_error(value: np.array, reference: np.array) -> np.array:
+    """Angle between quaternions in degrees"""
+    value = value / np.maximum(np.linalg.norm(value, axis=1, keepdims=True), 1e-12)
+    reference = reference / \
+        np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+
+    dot = np.abs(np.sum(value * reference, axis=1))
+    return np.degrees(2.0 * np.arccos(np.clip(dot, 0.0, 1.0)))
+
+
+def scale_error(value: np.array, reference: np.array) -> np.array:
+    """Relative difference of scale"""
+    return np.max(np.abs(value - reference) / np.maximum(np.abs(reference), 1e-6), axis=1)
+
+
+# Interpolation and error functions of each animation channel path
+KeyframeReduction = {
+    "translation": (lerp, translation_error),
+    "rotation": (slerp, rotation_error),
+    "scale": (lerp, scale_error),
+}
+
+
+def reduce_keys(curves: list[tuple[np.array, np.array]], path: str, tolerance: float) -> tuple[list[np.array], float]:
+    """
+    Removes keys which are restored by interpolation of remaining keys within tolerance.
+    All curves are processed at once: keys are added back into every segment which error exceeds tolerance
+    until all segments fit, like in Ramer-Douglas-Peucker algorithm.
+
+    :param curves: List of (times, values) of channels with the same path
+    :param path: Channel path which defines interpolation and error metric
+    :param tolerance: Maximum error in units for translation, degrees for rotation and ratio for scale
+    :return: Indices of kept keys of each curve and max error of resulting curves
+    """
+    interpolate, error = KeyframeReduction[path]
+    if not curves:
+        return [], 0.0
+
+    lengths = np.array([len(times) for times, _ in curves], dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    times = np.concatenate([times for times, _ in curves]).astype(np.float64)
+    values = np.concatenate([values for _, values in curves]).astype(np.float64)
+    count = len(times)
+    indices = np.arange(count)
+
+    # First and last keys of each curve are always kept so segments never cross curves
+    kept = np.zeros(count, dtype=bool)
+    kept[offsets[lengths > 0]] = True
+    kept[(offsets + lengths - 1)[lengths > 0]] = True
+
+    max_error = 0.0
+    while True:
+        left = np.maximum.accumulate(np.where(kept, indices, 0))
+        right = np.minimum.accumulate(
+            np.where(kept, indices, count - 1)[::-1])[::-1]
+
+        candidates = np.flatnonzero(~kept)
+        if len(candidates) == 0:
+            max_error = 0.0
+            break
+
+        candidate_left = left[candidates]
+        candidate_right = right[candidates]
+        duration = times[candidate_right] - times[candidate_left]
+        factor = np.divide(times[candidates] - times[candidate_left], duration,
+                           out=np.zeros(len(candidates)), where=duration > 0)
+
+        candidate_error = error(
+            interpolate(values[candidate_left],
+                        values[candidate_right], factor),
+            values[candidates]
+        )
+        max_error = float(np.max(candidate_error))
+
+        # Key with max error of each segment is added back
+        exceeded = candidate_error > tolerance
+        if not exceeded.any():
+            break
+
+        order = np.lexsort((-candidate_error, candidate_left))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = candidate_left[order][1:] != candidate_left[order][:-1]
+        worst = order[first]
+        kept[candidates[worst[exceeded[worst]]]] = True
+
+    return [indices[offset:offset + length][kept[offset:offset + length]] - offset for offset, length in zip(offsets, lengths)], max_error
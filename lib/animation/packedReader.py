@@ -1,6 +1,8 @@
 from typing import List, Tuple
 from lib.animation.flags import OdinAnimationFlags
 from lib.animation.reader import OdinAnimationReader
+from lib.animation.store import AnimationStore, FrameTransformLength, TranslationChannel, RotationChannel, ScaleChannel
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 RotationChannels = 4
@@ -9,206 +11,212 @@ ScaleChannels = 3
 
 
 class OdinPackedReader(OdinAnimationReader):
-    def __init__(self, gltf, animation: dict):
+    def __init__(self, gltf, animation: dict, lazy: bool = False):
         super().__init__(animation)
 
         self.descriptor: dict = animation.get("packed")
         self.nodes: List[dict] = self.descriptor.get("nodes")
         self.stride = 12
+        self.workers: int | None = getattr(gltf, "workers", None)
 
         # Normalized transform values
         self.normalized_transform_data = gltf.decode_accessor(
-            self.descriptor.get("dataAccessor"))
+            self.descriptor.get("dataAccessor")).reshape(-1)
 
         # Base transform values
         self.node_base_data = gltf.decode_accessor(
-            self.descriptor.get("nodeAccessor"))
+            self.descriptor.get("nodeAccessor")).reshape(-1)
 
         self.used_nodes = [node.get("nodeIndex") or 0 for node in self.nodes]
         self.flags = [OdinAnimationFlags(
             node.get("flags") or 0) for node in self.nodes]
+        layouts = [animation.layout for animation in self.flags]
 
-        frametime = [animation.has_frametime for animation in self.flags]
-        self.frame_stride = 0
-        if (True in frametime and False in frametime):
+        # Nodes without frametime are stored in frames of fixed stride.
+        # Nodes with frametime are stored after them one after another
+        fixed_elements = [
+            0 if layout.frametime_offset is not None else layout.elements_count for layout in layouts
+        ]
+        self.frame_stride = sum(fixed_elements)
+        self.fixed_frame_count = max(
+            [node.get("frameCount") or 0 for node, layout in zip(
+                self.nodes, layouts) if layout.frametime_offset is None],
+            default=0
+        )
+
+        # Offset of node elements inside of frame when frames have fixed stride
+        self.node_elements_offsets = np.cumsum(
+            [0] + fixed_elements).tolist()
+
+        # Offset of node data in stream for nodes with frametime
+        sequential_sizes = [
+            (node.get("frameCount") or 0) *
+            layout.elements_count if layout.frametime_offset is not None else 0
+            for node, layout in zip(self.nodes, layouts)
+        ]
+        self.node_offsets = (np.cumsum(
+            [0] + sequential_sizes) + self.fixed_frame_count * self.frame_stride).tolist()
+
+        # Nodes are read by offsets, so descriptor which does not match data can not be decoded
+        data_size = len(self.normalized_transform_data)
+        described_size = sum(node.get("dataSize") or 0 for node in self.nodes)
+        if (described_size > data_size):
             raise Exception(
-                "Looks like this animation file uses mixed way of using frametime which is not supported")
+                f"Animation nodes data size {described_size} exceeds size of data {data_size}")
+        self.validate_node_offsets(data_size)
 
-        elif (True not in frametime):
-            self.frame_stride = sum(
-                [animation.elements_count for animation in self.flags])
+        self.keyframe_mapping = [node.get("frameCount") for node in self.nodes]
 
-        self.data = []
-        self.transform_index = 0
+        # Each node is decoded to store on first request. Nodes of lazy reader have separate blocks so they can be released
+        self.store = AnimationStore(self.keyframe_mapping, [
+            layout.channels for layout in layouts], separate=lazy)
+        self.decoded = [False] * len(self.nodes)
 
-        self.data_size = 0
-        self.local_node_offset = 0
-        self.node_base_data_offset = 0
+        # Time of node frames which is decoded from frametime values
+        self.frame_times: List[np.ndarray | None] = [None] * len(self.nodes)
+        self.frames_matrix: np.array = None
 
-    def process_node(self, node_index: int):
+    def validate_node_offsets(self, data_size: int) -> None:
+        """Checks that frames of all nodes fit into data. Data can be longer than frames, for example when accessor is padded"""
+        if (self.node_offsets[-1] > data_size):
+            raise Exception(
+                f"Animation nodes take {self.node_offsets[-1]} values but data has only {data_size}")
+
+    def decode_node(self, node_index: int) -> None:
+        """Decodes node frames to store. Nodes are independent from each other so it can be called from several threads"""
         node = self.nodes[node_index]
         flags = self.flags[node_index]
         total_frame_count = node.get("frameCount")
-        self.data_size = node.get("dataSize")
-        self.node_base_data_offset = node_index * self.stride
 
         # Base transform
-        bTranslation = self.read_base_translation()
-        bRotation = self.read_base_rotation()
-        bScale = self.read_base_scale()
-
-        translation_multiplier = self.read_base_value()
-        scale_multiplier = self.read_base_value()
+        bTranslation, bRotation, bScale, translation_multiplier, scale_multiplier = self.read_base_transform(
+            node_index)
 
         # Step 1. Extracting normalized values from dataAccessor
         nTranslation, nRotation, nScale = self.read_normalized_transforms(
-            total_frame_count, flags
+            node_index, total_frame_count, flags
         )
 
-        # Step 2. Denormalizing values and filling buffers with values in raw view
-        translation, rotation, scale = self.denormalize_transforms(
+        # Step 2. Denormalizing values to block of frames in raw view
+        self.denormalize_transforms(
             total_frame_count, flags, (translation_multiplier, scale_multiplier, ),
             bTranslation, bRotation, bScale,
-            nTranslation, nRotation, nScale
+            nTranslation, nRotation, nScale,
+            self.store.get_node_block(node_index)
         )
 
-        self.data.append((translation, rotation, scale))
-        self.local_node_offset = 0
-        self.node_base_data_offset = 0
-        self.data_size = 0
-
     def denormalize_transforms(self,
                                frame_count: int, flags: OdinAnimationFlags, multiplier: Tuple[int, int],
                                bTranslation: np.array, bRotation: np.array, bScale: np.array,  # Base transform
-                               nTranslation: np.array, nRotation: np.array, nScale: np.array  # Delta transforms
-                               ):
-        translation_multiplier, scale_multiplier = multiplier
-
-        rotation = [
-            np.zeros((frame_count), dtype=np.float32)
-            for _ in range(RotationChannels)
+                               nTranslation: np.array, nRotation: np.array, nScale: np.array,  # Delta transforms
+                               result: np.ndarray | None = None
+                               ) -> np.array:
+        """Returns (frames, 10) block with Translation, Rotation and Scale of each frame. Block is written to result if it is provided"""
+        translation_multiplier, scale_multiplier = [
+            np.asarray(value, dtype=np.float32).reshape(-1)[0] for value in multiplier
         ]
 
-        translation = [
-            np.zeros((frame_count), dtype=np.float32)
-            for _ in range(TranslationChannels)
-        ]
-
-        scale = [
-            np.full((frame_count), 1, dtype=np.float32)
-            for _ in range(ScaleChannels)
-        ]
+        if (result is None):
+            result = np.empty((frame_count, FrameTransformLength), dtype=np.float32)
+        translation = result[:, :TranslationChannels]
+        rotation = result[:, TranslationChannels:TranslationChannels + RotationChannels]
+        scale = result[:, TranslationChannels + RotationChannels:]
 
-        for frame_index in range(frame_count):
-            for i in range(TranslationChannels):
-                value = float(bTranslation[i])
-                if flags.has_translation:
-                    transform = float(
-                        nTranslation[i][frame_index]) * translation_multiplier
-                    value += transform
+        # Translation and scale are calculated in single precision, rotation in double
+        channels = flags.layout.channels
+        translation[:] = np.asarray(bTranslation, dtype=np.float32).reshape(-1)
+        if channels & TranslationChannel:
+            translation += nTranslation.T.astype(np.float32) * \
+                translation_multiplier
 
-                translation[i][frame_index] = value
+        if channels & RotationChannel:
+            rotation[:] = nRotation.T / 32767.0
+        else:
+            rotation[:] = np.asarray(bRotation, dtype=np.float32).reshape(-1)
 
-            for i in range(RotationChannels):
-                value = float(bRotation[i])
-                if flags.has_rotation:
-                    value = float(nRotation[i][frame_index]) / 32767.0
+        scale[:] = np.asarray(bScale, dtype=np.float32).reshape(-1)
+        if channels & ScaleChannel:
+            scale += nScale.T.astype(np.float32) * scale_multiplier
 
-                rotation[i][frame_index] = value
-
-            for i in range(ScaleChannels):
-                value = float(bScale[i])
-                if flags.has_scale or flags.has_separate_scale:
-                    transform = float(
-                        nScale[i][frame_index]) * scale_multiplier
-                    value += transform
-
-                scale[i][frame_index] = value
-
-        return (translation, rotation, scale)
+        return result
 
-    def read_normalized_transforms(self, frame_count: int, flags: OdinAnimationFlags):
-        node_elements_counter = 0
-
-        rotation = [
-            np.zeros((frame_count), dtype=np.int16)
-            for _ in range(RotationChannels)
-        ] if flags.has_rotation else None
-
-        translation = [
-            np.zeros((frame_count), dtype=np.int16)
-            for _ in range(TranslationChannels)
-        ] if flags.has_translation else None
-
-        scale = [
-            np.zeros((frame_count), dtype=np.int16)
-            for _ in range(ScaleChannels)
-        ] if (flags.has_scale or flags.has_separate_scale) else None
-
-        for frame_index in range(frame_count):
-            if (not flags.has_frametime):
-                self.transform_index = (
-                    self.frame_stride * frame_index) + node_elements_counter
-
-            if (flags.has_frametime):
-                # Skip for now. Idk why it exist at all. Maybe for compatibility with gltf animations
-                frametime = self.read_normalized_value()
-
-            if (flags.has_rotation):
-                for i in range(RotationChannels):
-                    rotation[i][frame_index] = self.read_normalized_value()
-
-            if (flags.has_translation):
-                for i in range(TranslationChannels):
-                    translation[i][frame_index] = self.read_normalized_value()
-
-            if (flags.has_scale and flags.has_separate_scale):
-                for i in range(ScaleChannels):
-                    scale[i][frame_index] = self.read_normalized_value()
-            elif (flags.has_scale):
-                value = self.read_normalized_value()
-                for i in range(ScaleChannels):
-                    scale[i][frame_index] = value
+    def read_normalized_transforms(self, node_index: int, frame_count: int, flags: OdinAnimationFlags):
+        layout = flags.layout
+        elements_count = layout.elements_count
+
+        if (layout.frametime_offset is not None):
+            # Node frames are stored one after another
+            offset = self.node_offsets[node_index]
+            block = self.normalized_transform_data[offset:offset + frame_count * elements_count].reshape(
+                frame_count, elements_count)
+            self.frame_times[node_index] = self.create_frame_times(
+                block[:, layout.frametime_offset])
+        else:
+            # Nodes are stored in frames of the same stride, node values are columns of frames matrix
+            frames = self.get_frames_matrix()
+            offset = self.node_elements_offsets[node_index]
+            block = frames[:frame_count, offset:offset + elements_count]
+
+        return self.split_normalized_transforms(block, frame_count, flags)
+
+    def get_frames_matrix(self) -> np.array:
+        if (self.frames_matrix is None):
+            self.frames_matrix = self.normalized_transform_data[:self.fixed_frame_count * self.frame_stride].reshape(
+                self.fixed_frame_count, self.frame_stride)
+
+        return self.frames_matrix
+
+    @staticmethod
+    def split_normalized_transforms(block: np.array, frame_count: int, flags: OdinAnimationFlags):
+        """Splits (frames, elements) block of node values to (channels, frames) arrays of each transform"""
+        block = block.T.astype(np.int16)
+        layout = flags.layout
+
+        rotation = None
+        if (layout.rotation_offset is not None):
+            rotation = block[layout.rotation_offset:layout.rotation_offset + RotationChannels]
+
+        translation = None
+        if (layout.translation_offset is not None):
+            translation = block[layout.translation_offset:layout.translation_offset + TranslationChannels]
+
+        scale = None
+        if (layout.scale_count == ScaleChannels):
+            scale = block[layout.scale_offset:layout.scale_offset + ScaleChannels]
+        elif (layout.scale_count):
+            scale = np.repeat(block[layout.scale_offset:layout.scale_offset + 1], ScaleChannels, axis=0)
+        elif (layout.channels & ScaleChannel):
+            scale = np.zeros((ScaleChannels, frame_count), dtype=np.int16)
 
         return (translation, rotation, scale)
 
-    def read_normalized_value(self) -> int | float:
-        result = self.normalized_transform_data[self.transform_index]
-        self.transform_index += 1
-        return result
-
-    def read_base_translation(self) -> List[int]:
-        return [
-            self.read_base_value()
-            for _ in range(TranslationChannels)
-        ]
+    def read_base_transform(self, node_index: int) -> Tuple[np.array, np.array, np.array, float, float]:
+        """Returns base Translation, Rotation, Scale and multipliers of Translation and Scale"""
+        base = self.node_base_data[node_index *
+                                   self.stride:(node_index + 1) * self.stride]
+
+        return (
+            base[0:3],
+            base[3:7],
+            base[7:10],
+            base[10],
+            base[11]
+        )
 
-    def read_base_rotation(self) -> List[int]:
-        return [
-            self.read_base_value()
-            for _ in range(RotationChannels)
-        ]
+    def load_node(self, node_index: int) -> None:
+        if (not self.decoded[node_index]):
+            self.decode_node(node_index)
+            self.decoded[node_index] = True
 
-    def read_base_scale(self) -> List[int]:
-        return [
-            self.read_base_value()
-            for _ in range(ScaleChannels)
-        ]
-
-    def read_base_value(self) -> int:
-        idx = self.node_base_data_offset + self.local_node_offset
-        self.local_node_offset += 1
-        return self.node_base_data[idx]
+    def release_node(self, node_index: int) -> None:
+        self.decoded[node_index] = False
+        self.frame_times[node_index] = None
+        self.store.release_node(node_index)
 
     def read(self):
-        self.keyframe_mapping = [node.get("frameCount") for node in self.nodes]
-        
-        for i in range(len(self.nodes)):
-            self.process_node(i)
-
-    def get_frame_data(self, node_index: int, frame_index: int) -> Tuple[list, list, list]:
-        translation, rotation, scale = self.data[node_index]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self.load_node, range(len(self.nodes))))
 
-        return ([channel[frame_index] for channel in translation],
-                [channel[frame_index] for channel in rotation],
-                [channel[frame_index] for channel in scale])
+    def get_node_frame_times(self, node_index: int) -> np.ndarray | None:
+        self.load_node(node_index)
+        return self.frame_times[node_index]
@@ -0,0 +1,146 @@
+from typing import List, Tuple
+from lib.animation.flags import OdinAnimationFlags
+import numpy as np
+
+# Max absolute value of normalized transform
+NormalizedRange = 32767
+
+# Counters of continuous layout are stored in the same int16 stream as values
+MaxRunLength = 32767
+
+IdentityRotation = np.array([0.0, 0.0, 0.0, 1.0], dtype=np.float32)
+
+
+def quantize_transforms(values: np.array) -> Tuple[np.array, np.array, np.array, np.array]:
+    """
+    Converts (nodes, frames, components) values to base + normalized * multiplier form which is used by OdinPackedReader.
+    Multiplier is shared by all components of node
+
+    :return: Animated mask, base values, multipliers and normalized int16 values
+    """
+    low = values.min(axis=1)
+    high = values.max(axis=1)
+    animated = (values != values[:, :1]).any(axis=(1, 2))
+
+    base = np.where(animated[:, None], (low + high) / 2, values[:, 0]).astype(np.float32)
+    multiplier = ((high - low).max(axis=1).astype(np.float64) / 2 / NormalizedRange).astype(np.float32)
+    multiplier[~animated] = 0
+
+    divider = np.where(animated, multiplier, 1.0)[:, None, None]
+    normalized = np.clip(np.round((values - base[:, None]) / divider), -NormalizedRange, NormalizedRange)
+
+    return animated, base, multiplier, normalized.astype(np.int16)
+
+
+def encode_runs(block: np.array) -> np.array:
+    """
+    Encodes (frames, elements) block of node to run-length stream of continuous layout.
+    Stream starts with keyframes count and keyframes, then repeat counts and keyframes counts with keyframes alternate
+    """
+    frame_count = len(block)
+    repeat = np.zeros(frame_count, dtype=bool)
+    repeat[1:] = (block[1:] == block[:-1]).all(axis=1)
+
+    run_starts = np.flatnonzero(np.concatenate([[True], repeat[1:] != repeat[:-1]]))
+    run_ends = np.append(run_starts[1:], frame_count)
+
+    stream: List[np.array] = []
+    for start, end in zip(run_starts.tolist(), run_ends.tolist()):
+        is_repeat = bool(repeat[start])
+
+        # Long runs are split by empty runs of other kind
+        for offset in range(start, end, MaxRunLength):
+            if (offset != start):
+                stream.append(np.zeros(1, dtype=np.int16))
+
+            length = min(MaxRunLength, end - offset)
+            stream.append(np.array([length], dtype=np.int16))
+            if (not is_repeat):
+                stream.append(block[offset:offset + length].reshape(-1))
+
+    return np.concatenate(stream) if stream else np.zeros(0, dtype=np.int16)
+
+
+class OdinPackedWriter:
+    """Packs dense transforms of nodes to data which is read by OdinPackedReader or OdinContinuousPackedReader"""
+
+    def __init__(self, translation: np.array, rotation: np.array, scale: np.array):
+        self.frame_count = translation.shape[1]
+
+        rotation = rotation / np.maximum(np.linalg.norm(rotation, axis=2, keepdims=True), 1e-12)
+        self.rotation_animated = (rotation != rotation[:, :1]).any(axis=(1, 2))
+        self.base_rotation = rotation[:, 0].astype(np.float32)
+        self.rotation = np.round(rotation * NormalizedRange).astype(np.int16)
+
+        self.translation_animated, self.base_translation, self.translation_multiplier, self.translation = quantize_transforms(
+            translation)
+        self.scale_animated, self.base_scale, self.scale_multiplier, self.scale = quantize_transforms(
+            scale)
+
+        # Scale which changes the same way on all axes is stored as single value
+        delta = scale - scale[:, :1]
+        self.uniform_scale = (delta == delta[:, :, :1]).all(axis=(1, 2))
+
+    def create_flags(self, continuous: bool) -> List[OdinAnimationFlags]:
+        # Base rotation of continuous layout is stored as integers, so only identity is stored there
+        rotation = self.rotation_animated
+        if (continuous):
+            rotation = rotation | (self.base_rotation != IdentityRotation).any(axis=1)
+
+        flags = rotation * 2 + self.translation_animated * 4 + self.scale_animated * 8 + \
+            (self.scale_animated & ~self.uniform_scale) * 16
+
+        return [OdinAnimationFlags(int(value)) for value in flags]
+
+    def create_block(self, node_index: int, flags: OdinAnimationFlags) -> np.array:
+        """Returns (frames, elements) block of normalized values of node in the same order as it is read"""
+        layout = flags.layout
+        block = np.empty((self.frame_count, layout.elements_count), dtype=np.int16)
+        if (layout.rotation_offset is not None):
+            block[:, layout.rotation_offset:layout.rotation_offset + 4] = self.rotation[node_index]
+        if (layout.translation_offset is not None):
+            block[:, layout.translation_offset:layout.translation_offset + 3] = self.translation[node_index]
+        if (layout.scale_count):
+            block[:, layout.scale_offset:layout.scale_offset + layout.scale_count] = \
+                self.scale[node_index][:, :layout.scale_count]
+
+        return block
+
+    def write(self) -> Tuple[List[dict], np.ndarray, np.ndarray, np.ndarray | None]:
+        """
+        Packs nodes to layout which takes less space
+
+        :return: Node descriptors without node indices, normalized data, base data and base rotations of continuous layout
+        """
+        # Fixed stride layout
+        fixed_flags = self.create_flags(False)
+        fixed_blocks = [self.create_block(i, flags) for i, flags in enumerate(fixed_flags)]
+        fixed_data = np.concatenate(fixed_blocks, axis=1).reshape(-1)
+
+        # Run-length continuous layout
+        continuous_flags = self.create_flags(True)
+        continuous_streams = [
+            encode_runs(self.create_block(i, flags)) if flags.has_transform else np.zeros(0, dtype=np.int16)
+            for i, flags in enumerate(continuous_flags)
+        ]
+        continuous_data = np.concatenate(continuous_streams)
+
+        multipliers = np.stack([self.translation_multiplier, self.scale_multiplier], axis=1)
+        if (len(fixed_data) <= len(continuous_data)):
+            nodes = [
+                {"flags": flags.flags, "frameCount": self.frame_count, "dataSize": int(block.size)}
+                for flags, block in zip(fixed_flags, fixed_blocks)
+            ]
+            base = np.concatenate(
+                [self.base_translation, self.base_rotation, self.base_scale, multipliers], axis=1)
+
+            return nodes, fixed_data, base.astype(np.float32).reshape(-1), None
+
+        nodes = [
+            {"flags": flags.flags, "frameCount": self.frame_count, "dataSize": len(stream)}
+            for flags, stream in zip(continuous_flags, continuous_streams)
+        ]
+        base = np.concatenate([self.base_translation, self.base_scale, multipliers], axis=1)
+        rotation = np.tile(IdentityRotation.astype(np.uint32), len(nodes))
+
+        return nodes, continuous_data, base.astype(np.float32).reshape(-1), rotation
@@ -1,5 +1,5 @@
 from lib.animation.reader import OdinAnimationReader
-import numpy as np
+from lib.animation.store import AnimationStore, AllChannels
 
 class OdinRawAnimationReader(OdinAnimationReader):
     def __init__(self, gltf, animation: dict):
@@ -13,18 +13,14 @@ class OdinRawAnimationReader(OdinAnimationReader):
             self.keyframe_mapping = [num for i, num in enumerate(self.keyframe_mapping) for _ in range(nodes_per_keyframe[i])]
         
         self.buffer = gltf.decode_accessor(animation.get("accessor")) 
-        self.data: np.array = None   
+
+    def load_node(self, node_index: int) -> None:
+        if (self.store is None):
+            self.read()
 
     def read(self):       
-        keyframes_total = sum(self.keyframe_mapping) if self.keyframe_mapping else self.keyframe_count
+        # Nothing is decoded here, node data is just a view over accessor
+        node_keyframes = self.keyframe_mapping if self.keyframe_mapping else [self.keyframe_count] * len(self.used_nodes)
         
-        # Position + Quaternion Rotation + Scale
-        frame_transform_length = 3 + 4 + 3
-        if (self.keyframe_mapping):
-            remapped = np.reshape(self.buffer, (keyframes_total, frame_transform_length))
-            self.data = np.split(remapped, np.cumsum(self.keyframe_mapping)[:-1])
-        else:
-            self.data = np.reshape(self.buffer, (len(self.used_nodes), self.keyframe_count, frame_transform_length))
-    
-    def get_frame_data(self, node_index: int, frame_index: int):        
-        return np.array_split(self.data[node_index][frame_index], [3, 7])
\ No newline at end of file
+        # Frames of all nodes are stored one after another in the same layout as in store
+        self.store = AnimationStore(node_keyframes, [AllChannels] * len(self.used_nodes), self.buffer)
@@ -1,4 +1,10 @@
 from typing import Tuple, List
+from lib.animation.interpolation import lerp, slerp
+from lib.animation.store import AnimationStore
+import numpy as np
+
+# Components of Translation, Rotation and Scale
+TransformComponents = (3, 4, 3)
 
 class OdinAnimationReader:
     def __init__(self, animation: dict):
@@ -8,17 +14,102 @@ class OdinAnimationReader:
         self.nodes_per_keyframe = animation.get("nodesNumberPerKeyframe")
         self.keyframe_mapping: List[int] | None = None
         self.used_nodes: List[int] = []
+
+        # Decoded transforms of all nodes
+        self.store: AnimationStore = None
         
     def read(self):
-        """Reads buffer data"""        
-        raise NotImplementedError()
-    
-    def get_frame_data(node_index: int, frame_index: int) -> Tuple[list, list, list]:
-        """Returns frame data for specific node in format (Translation, Rotation, Scale)"""        
+        """Reads buffer data of all nodes. Without it node data is read on first request"""        
         raise NotImplementedError()
-        
-        
-    
     
-    
-    
\ No newline at end of file
+    def load_node(self, node_index: int) -> None:
+        """Makes sure that node transforms are written to store"""
+        pass
+
+    def release_node(self, node_index: int) -> None:
+        """Frees decoded data of node if reader allows it. Node is decoded again on next request"""
+        pass
+
+    def get_frame_data(self, node_index: int, frame_index: int) -> Tuple[np.array, np.array, np.array]:
+        """Returns frame data for specific node in format (Translation, Rotation, Scale)"""
+        self.load_node(node_index)
+        return self.store.get_frame_data(node_index, frame_index)
+
+    def get_node_data(self, node_index: int) -> Tuple[np.array, np.array, np.array]:
+        """Returns all frames of specific node as (frames, 3), (frames, 4), (frames, 3) arrays in format (Translation, Rotation, Scale)"""
+        self.load_node(node_index)
+        return self.store.get_node_data(node_index)
+
+    def get_node_key_frames(self, node_index: int) -> np.ndarray | None:
+        """Returns indices of node frames which can not be restored by interpolation of other frames, or None if all frames are needed"""
+        return None
+
+    def get_node_frame_times(self, node_index: int) -> np.ndarray | None:
+        """Returns time in seconds of each node frame, or None if frames are uniform with frame rate of animation"""
+        return None
+
+    def create_frame_times(self, frame_numbers: np.ndarray) -> np.ndarray | None:
+        """Converts stored frame numbers to times in seconds. Frames which are not strictly increasing can not be used as animation input so None is returned"""
+        frame_numbers = np.asarray(frame_numbers, dtype=np.float64)
+        if (len(frame_numbers) > 1 and not (np.diff(frame_numbers) > 0).all()):
+            return None
+
+        return (frame_numbers * self.frame_spf).astype(np.float32)
+
+    def get_node_keyframe_count(self, node_index: int) -> int:
+        """Returns count of frames of specific node"""
+        return self.keyframe_mapping[node_index] if self.keyframe_mapping else self.keyframe_count
+
+    def sample(self, times: np.ndarray, node_indices: List[int] | None = None) -> Tuple[np.array, np.array, np.array]:
+        """
+        Samples transforms of nodes at given times in seconds. Times outside of node frames are clamped to the first or the last frame.
+        Only frames around sampled times are copied from node data, but each sampled node is fully decoded first,
+        so sampling of few times costs as much as get_node_data. Lazy reader keeps decoded nodes until release_node
+
+        :param node_indices: Indices of nodes in used_nodes, all nodes by default
+        :return: (nodes, times, 3), (nodes, times, 4), (nodes, times, 3) arrays in format (Translation, Rotation, Scale)
+        """
+        times = np.asarray(times, dtype=np.float64).reshape(-1)
+        if (node_indices is None):
+            node_indices = range(len(self.used_nodes))
+        node_indices = list(node_indices)
+
+        result = [
+            np.empty((len(node_indices), len(times), components), dtype=np.float32) for components in TransformComponents
+        ]
+
+        # Nodes with the same key times share sampling positions and are interpolated together
+        groups: dict[bytes, Tuple[np.array, List[int]]] = {}
+        for number, node_index in enumerate(node_indices):
+            key_times = self.get_node_frame_times(node_index)
+            if (key_times is None):
+                key_times = np.arange(self.get_node_keyframe_count(node_index), dtype=np.float64) * self.frame_spf
+
+            key_times = np.asarray(key_times, dtype=np.float64)
+            groups.setdefault(key_times.tobytes(), (key_times, []))[1].append(number)
+
+        for key_times, numbers in groups.values():
+            frame_count = len(key_times)
+            if (frame_count == 0):
+                for values in result:
+                    values[numbers] = np.nan
+                continue
+
+            # Times at the last key take it as is, so shortest path of slerp does not flip its sign
+            positions = np.interp(times, key_times, np.arange(frame_count, dtype=np.float64))
+            index = np.clip(np.floor(positions).astype(np.int64), 0, frame_count - 1)
+            next_index = np.minimum(index + 1, frame_count - 1)
+            factor = np.clip(positions - index, 0.0, 1.0)
+
+            curves = [self.get_node_data(node_indices[number]) for number in numbers]
+            for path, interpolate in enumerate((lerp, slerp, lerp)):
+                start = np.concatenate([curve[path][index] for curve in curves]).astype(np.float64)
+                end = np.concatenate([curve[path][next_index] for curve in curves]).astype(np.float64)
+
+                values = interpolate(start, end, np.tile(factor, len(numbers)))
+                if (interpolate is slerp):
+                    values /= np.maximum(np.linalg.norm(values, axis=1, keepdims=True), 1e-12)
+
+                result[path][numbers] = values.reshape(len(numbers), len(times), -1)
+
+        return tuple(result)
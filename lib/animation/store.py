@@ -0,0 +1,88 @@
+from typing import List, Tuple
+import numpy as np
+
+# Channel presence bits
+TranslationChannel = 1
+RotationChannel = 2
+ScaleChannel = 4
+AllChannels = TranslationChannel | RotationChannel | ScaleChannel
+
+# Channel bits of glTF animation paths
+PathChannels = {
+    "translation": TranslationChannel,
+    "rotation": RotationChannel,
+    "scale": ScaleChannel
+}
+
+# Position + Quaternion Rotation + Scale
+FrameTransformLength = 3 + 4 + 3
+
+
+class AnimationStore:
+    """
+    Decoded transforms of all animation nodes in single (frames, 10) float32 block.
+    Frames of nodes are stored one after another, node frames are located by offsets table.
+    Separate store keeps each node in its own block which is allocated on first write and can be released
+    """
+
+    def __init__(self, frame_counts: List[int], channels: List[int], data: np.ndarray | None = None, separate: bool = False):
+        self.node_offsets = np.zeros(len(frame_counts) + 1, dtype=np.int64)
+        np.cumsum(frame_counts, out=self.node_offsets[1:])
+
+        # Presence bits of channels which are animated in each node
+        self.channels = np.asarray(channels, dtype=np.uint8)
+
+        # Blocks of nodes of separate store
+        self.blocks: List[np.ndarray | None] | None = [None] * len(frame_counts) if separate else None
+        if (separate):
+            return
+
+        if (data is None):
+            data = np.empty(
+                (self.node_offsets[-1], FrameTransformLength), dtype=np.float32)
+        self.data: np.ndarray = data.reshape(-1, FrameTransformLength)
+
+        # Transforms are strided views over whole block
+        self.translation = self.data[:, 0:3]
+        self.rotation = self.data[:, 3:7]
+        self.scale = self.data[:, 7:10]
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def get_node_block(self, node_index: int) -> np.ndarray:
+        """Returns (frames, 10) block of node which can be written to"""
+        if (self.blocks is None):
+            return self.data[self.node_offsets[node_index]:self.node_offsets[node_index + 1]]
+
+        block = self.blocks[node_index]
+        if (block is None):
+            block = np.empty((self.node_offsets[node_index + 1] - self.node_offsets[node_index],
+                             FrameTransformLength), dtype=np.float32)
+            self.blocks[node_index] = block
+
+        return block
+
+    def release_node(self, node_index: int) -> None:
+        """Frees block of node in separate store. Block is allocated again when node is written next time"""
+        if (self.blocks is not None):
+            self.blocks[node_index] = None
+
+    def get_node_data(self, node_index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if (self.blocks is not None):
+            block = self.get_node_block(node_index)
+            return (block[:, 0:3], block[:, 3:7], block[:, 7:10])
+
+        start, end = self.node_offsets[node_index], self.node_offsets[node_index + 1]
+        return (self.translation[start:end], self.rotation[start:end], self.scale[start:end])
+
+    def get_frame_data(self, node_index: int, frame_index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if (self.blocks is not None):
+            frame = self.get_node_block(node_index)[frame_index]
+            return (frame[0:3], frame[3:7], frame[7:10])
+
+        frame = self.node_offsets[node_index] + frame_index
+        return (self.translation[frame], self.rotation[frame], self.scale[frame])
+
+    def has_channel(self, node_index: int, channel: int) -> bool:
+        return bool(self.channels[node_index] & channel)
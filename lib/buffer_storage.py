@@ -0,0 +1,86 @@
+from threading import Lock
+import tempfile
+import shutil
+
+# Size of parts in which storage is copied to output
+CopyChunkSize = 1 << 20
+
+
+class BufferStorage:
+    """Temporary file which holds buffer views data with the same layout as in output binary chunk"""
+    Alignment = 16
+
+    def __init__(self) -> None:
+        self.file = tempfile.TemporaryFile()
+        self.length = 0
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def write(self, data: bytes) -> int:
+        """Appends data aligned to 16 bytes and returns its offset"""
+        with self.lock:
+            offset = self.length
+            padding = -len(data) % BufferStorage.Alignment
+
+            self.file.seek(offset)
+            self.file.write(data)
+            self.file.write(bytes(padding))
+            self.length += len(data) + padding
+
+        return offset
+
+    def overwrite(self, offset: int, data: bytes) -> None:
+        """Replaces already written data"""
+        with self.lock:
+            self.file.seek(offset)
+            self.file.write(data)
+
+    def read(self, offset: int, length: int) -> bytes:
+        with self.lock:
+            self.file.seek(offset)
+            return self.file.read(length)
+
+    def copy_to(self, stream, offset: int = 0, length: int | None = None) -> None:
+        """Copies part of storage to stream, whole storage by default"""
+        with self.lock:
+            self.file.seek(offset)
+            if length is None:
+                shutil.copyfileobj(self.file, stream)
+                return
+
+            while length > 0:
+                data = self.file.read(min(length, CopyChunkSize))
+                if not data:
+                    break
+
+                stream.write(data)
+                length -= len(data)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class BufferStorageLayout:
+    """Parts of storage which are written to output one after another. Data is aligned inside of storage, so padding is copied together with it"""
+
+    def __init__(self, storage: BufferStorage) -> None:
+        self.storage = storage
+        self.parts: list[list[int]] = []
+
+    def __len__(self) -> int:
+        return sum(length for _, length in self.parts)
+
+    def append(self, offset: int, length: int) -> None:
+        length += -length % BufferStorage.Alignment
+
+        # Views which were written one after another are copied as single part
+        if self.parts and sum(self.parts[-1]) == offset:
+            self.parts[-1][1] += length
+        else:
+            self.parts.append([offset, length])
+
+    def copy_to(self, stream) -> None:
+        for offset, length in self.parts:
+            self.storage.copy_to(stream, offset, length)
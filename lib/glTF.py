@@ -1,7 +1,9 @@
-from binary_reader import BinaryReader
 from lib.flatbuffer import serialize_glb_json, deserialize_glb_json
+from lib.buffer_storage import BufferStorage, BufferStorageLayout
+from io import BytesIO
 from json import JSONEncoder, dumps, loads
 import math
+import struct
 
 
 def ProcessObjectJSON(obj):
@@ -29,7 +31,7 @@ class glTF_Chunk:
             return
 
         self.data = serialize_glb_json(
-            loads(self.data)
+            self.data if isinstance(self.data, dict) else loads(self.data)
         )
         self.name = "FLA2"
 
@@ -59,43 +61,57 @@ class glTF:
         raise ValueError(f"Failed to get {name} chunk")
 
     def write(self) -> bytes:
-        stream = BinaryReader()
-
-        stream.write_str("glTF")  # Magic
-        stream.write_uint32(2)  # Version
+        stream = BytesIO()
+        self.write_to(stream)
+        return stream.getvalue()
 
+    def write_to(self, stream) -> None:
+        """Writes file to stream. Chunks data can be stored in BufferStorage which is copied without loading to memory"""
         chunks_data = [chunk.save() for chunk in self.chunks]
-
         chunks_length = sum(len(chunk) + 8 for chunk in chunks_data)
-        stream.write_uint32(len(stream.buffer()) + 4 + chunks_length)
+
+        stream.write(b"glTF")  # Magic
+        stream.write(struct.pack("<II", 2, 12 + chunks_length))  # Version, Length
 
         for i, chunk in enumerate(self.chunks):
-            stream.write_uint32(len(chunks_data[i]))
-            stream.write_str_fixed(chunk.name, 4)
-            stream.write_bytes(chunks_data[i])
+            stream.write(struct.pack("<I", len(chunks_data[i])))
+            stream.write(chunk.name.encode("utf8")[:4].ljust(4, b"\0"))
 
-        return bytes(stream.buffer())
+            if isinstance(chunks_data[i], (BufferStorage, BufferStorageLayout)):
+                chunks_data[i].copy_to(stream)
+            else:
+                stream.write(chunks_data[i])
 
-    def read(self, data: bytes) -> None:
-        stream = BinaryReader(data)
+    def read(self, data: bytes, copy: bool = True) -> None:
+        """
+        Reads file chunks from data.
 
-        magic = stream.read_str(4)
+        :param copy: When disabled, binary chunk is kept as a view into data without copying, e.g. for memory mapped files
+        """
+        view = memoryview(data)
+
+        magic = bytes(view[0:4]).split(b"\0", 1)[0].decode("utf8")
         if (magic != "glTF"):
             raise ValueError(f"File has corrupted magic: {magic}")
 
-        version = stream.read_uint32()
+        version, file_length = struct.unpack_from("<II", view, 4)
         if (version != 2):
             raise ValueError(f"File has unknown version: {version}")
 
-        file_length = stream.read_uint32()
         if (len(data) != file_length):
             raise ValueError(
                 f"File has corrupted length: expected {file_length}")
 
-        while (not stream.eof()):
-            chunk_length = stream.read_uint32()
-            chunk_magic = stream.read_str(4)
-            chunk_data = stream.read_bytes(chunk_length)
+        offset = 12
+        while (offset < len(data)):
+            chunk_length, = struct.unpack_from("<I", view, offset)
+            chunk_magic = bytes(view[offset + 4:offset + 8]).split(
+                b"\0", 1)[0].decode("utf8")
+            chunk_data = view[offset + 8:offset + 8 + chunk_length]
+            offset += 8 + chunk_length
+
+            if (copy or chunk_magic != "BIN"):
+                chunk_data = bytes(chunk_data)
 
             self.chunks.append(
                 glTF_Chunk(chunk_magic, chunk_data)
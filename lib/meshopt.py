@@ -0,0 +1,248 @@
+import numpy as np
+
+# Bitstream codecs of EXT_meshopt_compression extension
+# https://github.com/KhronosGroup/glTF/tree/main/extensions/2.0/Vendor/EXT_meshopt_compression
+
+VertexHeader = 0xA0
+IndexSequenceHeader = 0xD0
+IndexSequenceVersion = 1
+
+ByteGroupSize = 16
+VertexBlockSizeBytes = 8192
+VertexBlockMaxSize = 256
+TailMaxSize = 32
+
+
+def vertex_block_size(vertex_size: int) -> int:
+    result = VertexBlockSizeBytes // vertex_size
+    result &= ~(ByteGroupSize - 1)
+    return min(result, VertexBlockMaxSize)
+
+
+def zigzag8(array: np.array) -> np.array:
+    return (array.view(np.int8) >> 7).view(np.uint8) ^ (array << 1)
+
+
+def unzigzag8(array: np.array) -> np.array:
+    return (np.uint8(0) - (array & 1)) ^ (array >> 1)
+
+
+#! ---------------- Encoding ----------------
+
+
+def encode_bytes(streams: np.array) -> np.array:
+    """
+    Encodes byte streams of equal length (multiple of 16) using byte groups
+    Result is a concatenation of all encoded streams in the same order
+
+    :param streams: uint8 array with (streams, length) shape
+    """
+    stream_count = streams.shape[0]
+    groups = streams.reshape(stream_count, -1, ByteGroupSize)
+    group_count = groups.shape[1]
+
+    # Encoded size of each group for every bit width. Values which doesn't fit are stored after packed bits
+    size2 = 4 + np.count_nonzero(groups >= 3, axis=2)
+    size4 = 8 + np.count_nonzero(groups >= 15, axis=2)
+
+    # Bits per value in log2 form: 0 - zero group, 1 - 2 bits, 2 - 4 bits, 3 - raw bytes
+    bits = np.where(size2 < ByteGroupSize, 1, 3)
+    best_size = np.minimum(size2, ByteGroupSize)
+    bits = np.where(size4 < best_size, 2, bits)
+    bits = np.where(groups.any(axis=2), bits, 0)
+
+    header_size = (group_count + 3) // 4
+    header_bits = np.zeros((stream_count, header_size * 4), dtype=np.uint8)
+    header_bits[:, :group_count] = bits
+    header = np.bitwise_or.reduce(
+        header_bits.reshape(stream_count, header_size, 4) << np.array(
+            [0, 2, 4, 6], dtype=np.uint8),
+        axis=2
+    ).astype(np.uint8)
+
+    # Packed values are stored from most significant bits
+    packed2 = np.minimum(groups, 3).reshape(stream_count, group_count, 4, 4)
+    packed2 = np.bitwise_or.reduce(
+        packed2 << np.array([6, 4, 2, 0], dtype=np.uint8), axis=3)
+    packed4 = np.minimum(groups, 15).reshape(stream_count, group_count, 8, 2)
+    packed4 = np.bitwise_or.reduce(
+        packed4 << np.array([4, 0], dtype=np.uint8), axis=3)
+
+    packed = np.zeros_like(groups)
+    packed_mask = np.zeros(groups.shape, dtype=bool)
+    packed[..., :4] = np.where((bits == 1)[..., None], packed2, 0)
+    packed[..., :8] = np.where((bits == 2)[..., None], packed4, packed[..., :8])
+    packed_mask[..., :4] = (bits == 1)[..., None]
+    packed_mask[..., :8] |= (bits == 2)[..., None]
+
+    values_mask = ((bits == 1)[..., None] & (groups >= 3)) | \
+        ((bits == 2)[..., None] & (groups >= 15)) | \
+        (bits == 3)[..., None]
+
+    group_data = np.concatenate([packed, groups], axis=2)
+    group_mask = np.concatenate([packed_mask, values_mask], axis=2)
+
+    stream_data = np.concatenate(
+        [header, group_data.reshape(stream_count, -1)], axis=1)
+    stream_mask = np.concatenate(
+        [np.ones(header.shape, dtype=bool), group_mask.reshape(stream_count, -1)], axis=1)
+
+    return stream_data[stream_mask]
+
+
+def encode_vertex_buffer(data: bytes, count: int, vertex_size: int) -> bytes:
+    """Encodes buffer of `count` elements with `vertex_size` bytes each using attributes codec"""
+    assert vertex_size % 4 == 0 and 0 < vertex_size <= 256
+
+    vertices = np.frombuffer(data, dtype=np.uint8, count=count * vertex_size).reshape(
+        count, vertex_size)
+
+    # Each byte is predicted from the same byte of the previous vertex
+    previous = np.concatenate([vertices[:1], vertices[:-1]])
+    deltas = zigzag8(vertices - previous)
+
+    result = [bytes([VertexHeader])]
+
+    block_size = vertex_block_size(vertex_size)
+    full_blocks = count // block_size
+    if full_blocks:
+        streams = deltas[:full_blocks * block_size].reshape(
+            full_blocks, block_size, vertex_size).transpose(0, 2, 1).reshape(-1, block_size)
+        result.append(encode_bytes(streams).tobytes())
+
+    remainder = count - full_blocks * block_size
+    if remainder:
+        aligned = (remainder + ByteGroupSize - 1) & ~(ByteGroupSize - 1)
+        streams = np.zeros((vertex_size, aligned), dtype=np.uint8)
+        streams[:, :remainder] = deltas[full_blocks * block_size:].T
+        result.append(encode_bytes(streams).tobytes())
+
+    # Tail holds first vertex which is used as prediction baseline
+    tail_size = max(vertex_size, TailMaxSize)
+    result.append(bytes(tail_size - vertex_size))
+    result.append(vertices[0].tobytes() if count else bytes(vertex_size))
+
+    return b''.join(result)
+
+
+def encode_index_sequence(indices: np.array) -> bytes:
+    """Encodes index buffer using index sequence codec"""
+    indices = np.asarray(indices, dtype=np.uint32).reshape(-1)
+
+    # All indices are encoded as delta from the previous one so only the first baseline is used
+    previous = np.concatenate([np.zeros(1, dtype=np.uint32), indices[:-1]])
+    delta = indices - previous
+    value = (delta << np.uint32(1)) ^ (delta.view(np.int32) >>
+                                       31).view(np.uint32)
+    value = (value << np.uint32(1)).astype(np.uint64)
+
+    # Variable length encoding with 7 bits per byte
+    shifts = np.arange(5, dtype=np.uint64) * np.uint64(7)
+    byte_count = 1 + np.count_nonzero(
+        value[:, None] >= (np.uint64(1) << shifts[1:]), axis=1)
+    encoded = ((value[:, None] >> shifts) & np.uint64(127)).astype(np.uint8)
+    encoded |= np.where(np.arange(5) < (byte_count - 1)
+                        [:, None], 128, 0).astype(np.uint8)
+    mask = np.arange(5) < byte_count[:, None]
+
+    return bytes([IndexSequenceHeader | IndexSequenceVersion]) + encoded[mask].tobytes() + bytes(4)
+
+
+#! ---------------- Decoding ----------------
+
+
+def decode_bytes(data: bytes, offset: int, length: int) -> tuple[np.array, int]:
+    group_count = length // ByteGroupSize
+    header = data[offset:offset + (group_count + 3) // 4]
+    offset += len(header)
+
+    result = np.zeros(length, dtype=np.uint8)
+    for group in range(group_count):
+        bits = (header[group // 4] >> ((group % 4) * 2)) & 3
+        values = result[group * ByteGroupSize:(group + 1) * ByteGroupSize]
+
+        if bits == 0:
+            continue
+
+        if bits == 3:
+            values[:] = np.frombuffer(
+                data, dtype=np.uint8, count=ByteGroupSize, offset=offset)
+            offset += ByteGroupSize
+            continue
+
+        width = 2 if bits == 1 else 4
+        packed_size = ByteGroupSize * width // 8
+        packed = np.frombuffer(data, dtype=np.uint8,
+                               count=packed_size, offset=offset)
+        offset += packed_size
+
+        shifts = np.arange(8 - width, -1, -width, dtype=np.uint8)
+        limit = (1 << width) - 1
+        unpacked = ((packed[:, None] >> shifts) & limit).reshape(-1)
+        for i, value in enumerate(unpacked):
+            if value == limit:
+                value = data[offset]
+                offset += 1
+            values[i] = value
+
+    return result, offset
+
+
+def decode_vertex_buffer(data: bytes, count: int, vertex_size: int) -> bytes:
+    """Decodes buffer produced by attributes codec"""
+    if data[0] & 0xF0 != VertexHeader:
+        raise ValueError("Unknown attributes data header")
+
+    last_vertex = np.frombuffer(
+        data, dtype=np.uint8, count=vertex_size, offset=len(data) - vertex_size)
+    result = np.zeros((count, vertex_size), dtype=np.uint8)
+
+    offset = 1
+    block_size = vertex_block_size(vertex_size)
+    for block_start in range(0, count, block_size):
+        size = min(block_size, count - block_start)
+        aligned = (size + ByteGroupSize - 1) & ~(ByteGroupSize - 1)
+
+        for k in range(vertex_size):
+            deltas, offset = decode_bytes(data, offset, aligned)
+            values = np.cumsum(unzigzag8(deltas[:size]), dtype=np.uint8)
+            result[block_start:block_start + size, k] = values + last_vertex[k]
+
+        last_vertex = result[block_start + size - 1]
+
+    if len(data) - offset != max(vertex_size, TailMaxSize):
+        raise ValueError("Attributes data has unexpected length")
+
+    return result.tobytes()
+
+
+def decode_index_sequence(data: bytes, count: int) -> np.array:
+    """Decodes buffer produced by index sequence codec"""
+    if data[0] & 0xF0 != IndexSequenceHeader:
+        raise ValueError("Unknown index sequence header")
+
+    result = np.zeros(count, dtype=np.uint32)
+    last = [0, 0]
+    offset = 1
+    for i in range(count):
+        value = 0
+        shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 127) << shift
+            shift += 7
+            if byte < 128:
+                break
+
+        current = value & 1
+        value >>= 1
+        delta = (value >> 1) ^ -(value & 1)
+        index = (last[current] + delta) & 0xFFFFFFFF
+        last[current] = index
+        result[i] = index
+
+    if len(data) - offset != 4:
+        raise ValueError("Index sequence data has unexpected length")
+
+    return result
@@ -1,10 +1,21 @@
 from lib.glTF import glTF, glTF_Chunk
+from lib.buffer_storage import BufferStorage, BufferStorageLayout
+from lib.scene_graph import SceneGraph
 from binary_reader import BinaryReader
 from lib.gltf_constants import DataType, ComponentType
 from lib.odin_attribute import OdinAttribute
+from lib.odin_layout import OdinVertexLayout, get_vertex_layout
+from lib.meshopt import encode_vertex_buffer, encode_index_sequence
+from lib.vertex_cache import average_cache_miss_ratio, optimize_vertex_cache, optimize_overdraw, optimize_vertex_fetch, OverdrawThreshold
+from lib.quantization import quantize_snorm, quantize_unorm, quantize_weights, quantize_tangents, quantize_positions, position_dequantization
 from lib.odin_constants import OdinAttributeFormat, OdinAttributeType
 from lib.animation.flags import OdinAnimationFlags
 from lib.animation import OdinAnimation
+from lib.animation.store import PathChannels
+from lib.animation.keyframes import reduce_hold_keys, reduce_keys
+from lib.animation.interpolation import PathInterpolation, resample, resample_positions, resample_time_positions
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 import numpy as np
 import json
 
@@ -15,6 +26,20 @@ import json
 # Idk what sense of modifying component type
 # Maybe it more like GPU hint or smth like this
 
+# glTF animation channel paths with types of their output accessors
+AnimationPaths = [
+    ("translation", "VEC3"),
+    ("rotation", "VEC4"),
+    ("scale", "VEC3")
+]
+
+# Default node transform
+NodeRestTransform = {
+    "translation": [0.0, 0.0, 0.0],
+    "rotation": [0.0, 0.0, 0.0, 1.0],
+    "scale": [1.0, 1.0, 1.0]
+}
+
 
 class BufferView:
     def __init__(self) -> None:
@@ -22,11 +47,24 @@ class BufferView:
         self.data: bytes = b''
         self.offset: int | None = None
 
+    @property
+    def byte_length(self) -> int:
+        return len(self.data)
+
+    def read(self, offset: int, length: int) -> memoryview:
+        """Returns part of view data without copying"""
+        return memoryview(self.data)[offset:offset + length]
+
+    def write(self, offset: int, data: bytes) -> None:
+        """Replaces part of view data, view length is not changed"""
+        self.data = self.data[:offset] + bytes(data) + \
+            self.data[offset + len(data):]
+
     def serialize(self):
         data = {
             "buffer": 0,
             "byteOffset": self.offset,
-            "byteLength": len(self.data),
+            "byteLength": self.byte_length,
         }
 
         if self.stride is not None:
@@ -35,6 +73,83 @@ class BufferView:
         return data
 
 
+class SpilledBufferView(BufferView):
+    """Buffer view which data is kept in temporary file storage instead of memory"""
+
+    def __init__(self, storage: BufferStorage, data: bytes, stride: int | None = None) -> None:
+        self.stride = stride
+        self.storage = storage
+        self.length = len(data)
+        self.storage_offset = storage.write(data)
+        self.offset: int | None = None
+
+    @property
+    def data(self) -> bytes:
+        return self.storage.read(self.storage_offset, self.length)
+
+    @property
+    def byte_length(self) -> int:
+        return self.length
+
+    def read(self, offset: int, length: int) -> bytes:
+        length = max(0, min(length, self.length - offset))
+        return self.storage.read(self.storage_offset + offset, length)
+
+    def write(self, offset: int, data: bytes) -> None:
+        self.storage.overwrite(self.storage_offset + offset, data)
+
+
+class CompressedBufferView(BufferView):
+    """Buffer view compressed with EXT_meshopt_compression. Uncompressed view is located in fallback buffer"""
+
+    def __init__(self, source: BufferView, data: bytes, count: int, element_stride: int, mode: str, storage: BufferStorage | None = None) -> None:
+        self.stride = source.stride
+        self.offset: int | None = None
+        self.count = count
+        self.element_stride = element_stride
+        self.mode = mode
+        self.fallback_length = source.byte_length
+        self.fallback_offset: int | None = None
+
+        # Compressed data is spilled to storage the same way as regular views
+        if storage is not None:
+            self.payload: BufferView = SpilledBufferView(storage, data)
+        else:
+            self.payload = BufferView()
+            self.payload.data = data
+
+    @property
+    def data(self) -> bytes:
+        return self.payload.data
+
+    @property
+    def byte_length(self) -> int:
+        return self.payload.byte_length
+
+    def serialize(self):
+        data = {
+            "buffer": 1,
+            "byteOffset": self.fallback_offset,
+            "byteLength": self.fallback_length,
+        }
+
+        if self.stride is not None:
+            data["byteStride"] = self.stride
+
+        data["extensions"] = {
+            "EXT_meshopt_compression": {
+                "buffer": 0,
+                "byteOffset": self.offset,
+                "byteLength": self.byte_length,
+                "byteStride": self.element_stride,
+                "count": self.count,
+                "mode": self.mode
+            }
+        }
+
+        return data
+
+
 class SupercellOdinGLTF:
     UsedExtensions = [
         # "KHR_mesh_quantization",
@@ -46,15 +161,31 @@ class SupercellOdinGLTF:
         # "KHR_mesh_quantization"
     ]
 
-    def __init__(self, gltf: glTF) -> None:
+    def __init__(self, gltf: glTF, workers: int | None = None, quantize: bool = False, meshopt: bool = False, optimize: bool = False, stream: bool = False, animation_tolerance: tuple[float, float, float] | None = None, animation_fps: float | None = None) -> None:
         self.gltf = gltf
+        self.animation_fps = animation_fps
+        self.animation_tolerance = animation_tolerance
+        self.workers = workers
+        self.stream = stream
+        self.quantize = quantize
+        self.meshopt = meshopt
+        self.optimize = optimize
         self.json = gltf.get_chunk("JSON").data
         if isinstance(self.json, bytes):
             self.json = json.loads(self.json)
         self.buffers: list[BufferView] = []
+        # In stream mode buffer views are written to temporary file right after creation
+        self.storage: BufferStorage | None = BufferStorage() if stream else None
         self.odin_buffer_index: int = -1
         self.mesh_descriptors: list[dict] = []
         self.cached_mesh_descriptors: dict = {}
+        # Vertex layouts which warnings are already printed for this file
+        self.reported_layouts: set[OdinVertexLayout] = set()
+        self.reported_layouts_lock = Lock()
+        # Node hierarchy which is created once nodes are processed
+        self.scene_graph: SceneGraph | None = None
+        # Lines about optimization results, they are printed after file status
+        self.statistics: list[str] = []
 
         binary = gltf.get_chunk("BIN").data
         self.produce_buffers(binary)
@@ -129,25 +260,22 @@ class SupercellOdinGLTF:
 
     def process_nodes(self) -> None:
         nodes: list[dict] = self.json.get("nodes", [])
+        self.scene_graph = SceneGraph.from_odin_nodes(nodes)
 
-        childrens: dict[int, list[int]] = {}
-
-        def add_child(idx: int, parent_idx: int):
-            if (parent_idx not in childrens):
-                childrens[parent_idx] = []
-            childrens[parent_idx].append(idx)
-
-        for i, node in enumerate(nodes):
+        odin_parents: list[int] = []
+        for node in nodes:
             extensions: dict = node.get("extensions", {})
             if "SC_odin_format" not in extensions:
                 continue
 
             odin: dict = extensions.pop("SC_odin_format")
-            parent = odin.get("parent")
-            add_child(i, parent)
+            odin_parents.append(odin.get("parent"))
 
-        for idx, children in childrens.items():
-            nodes[idx]["children"] = children
+        # Children are written only to nodes which are parents in Odin hierarchy
+        for idx in sorted(set(odin_parents) - {None}):
+            if 0 <= idx < len(nodes):
+                nodes[idx]["children"] = self.scene_graph.get_children(
+                    idx).tolist()
 
     def process_skins(self) -> None:
         skins: list[dict] = self.json.get("skins", [])
@@ -162,8 +290,11 @@ class SupercellOdinGLTF:
     def create_primitive_cache(self, meshes: list[dict]) -> None:
         vertex_count = {}
         descriptors = {}
+        mesh_infos: dict[int, set] = {}
+        info_primitives: dict[int, list[dict]] = {}
+        plain_meshes: set[int] = set()
 
-        for mesh in meshes:
+        for mesh_index, mesh in enumerate(meshes):
             primitives = mesh.get("primitives")
             if (primitives is None):
                 continue
@@ -171,6 +302,7 @@ class SupercellOdinGLTF:
             for primitive in primitives:
                 extensions: dict = primitive.get("extensions", {})
                 if "SC_odin_format" not in extensions:
+                    plain_meshes.add(mesh_index)
                     continue
 
                 odin: dict = extensions["SC_odin_format"]
@@ -185,6 +317,8 @@ class SupercellOdinGLTF:
 
                 if info_index not in descriptors:
                     descriptors[info_index] = vertex_descriptors
+                mesh_infos.setdefault(mesh_index, set()).add(info_index)
+                info_primitives.setdefault(info_index, []).append(primitive)
 
                 if (info_index in vertex_count):
                     vertex_count[info_index] = max(
@@ -192,13 +326,324 @@ class SupercellOdinGLTF:
                 else:
                     vertex_count[info_index] = count
 
-        for idx, vertex_descriptors in descriptors.items():
-            attributes = {}
-            for descriptor in vertex_descriptors:
-                self.process_odin_primitive_descriptor(
-                    descriptor, attributes, vertex_count[idx])
+        def decode(idx: int, attribute_types: set | None = None) -> list:
+            return [
+                decoded_attribute
+                for descriptor in descriptors[idx]
+                for decoded_attribute in self.decode_odin_primitive_descriptor(
+                    descriptor, vertex_count[idx], attribute_types)
+            ]
+
+        optimizable = self.get_optimizable_primitives(
+            info_primitives) if self.optimize else set()
+        inplace_views = self.get_rewritable_views({
+            primitive["indices"] for idx in optimizable for primitive in info_primitives[idx]
+        })
+
+        transforms: dict[int, tuple[list[float], float]] = {}
+        if (self.quantize):
+            transforms = self.create_dequantization_transforms(
+                descriptors.keys(), mesh_infos, plain_meshes,
+                lambda idx: decode(idx, {OdinAttributeType.a_pos})
+            )
+
+        # Every mesh data info is decoded and post-processed on its own so they are independent from each other
+        def process(idx: int) -> tuple[list, list[tuple[int, bytes]], tuple[int, float, float]]:
+            decoded_attributes = decode(idx)
+
+            index_buffers: list[tuple[int, bytes]] = []
+            statistics = (0, 0.0, 0.0)
+            if idx in optimizable:
+                decoded_attributes, index_buffers, statistics = self.optimize_odin_primitives(
+                    decoded_attributes, info_primitives[idx], int(vertex_count[idx]))
+
+            if (self.quantize):
+                decoded_attributes = [
+                    self.quantize_odin_attribute(
+                        attribute, accessor, array, transforms.get(idx))
+                    for attribute, accessor, array in decoded_attributes
+                ]
+
+            return decoded_attributes, index_buffers, statistics
+
+        # Accessors and buffer views are assigned afterwards in descriptors order
+        # so output does not depend on threads scheduling
+        triangles_count = 0
+        misses_before = 0.0
+        misses_after = 0.0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # Stream mode processes infos one by one so only one of them is kept in memory at the same time
+            results = map(process, descriptors.keys()) if self.stream else pool.map(
+                process, descriptors.keys())
+
+            for idx, (decoded_attributes, index_buffers, statistics) in zip(descriptors.keys(), results):
+                attributes = {}
+                self.emit_odin_attributes(decoded_attributes, attributes)
+                self.cached_mesh_descriptors[idx] = attributes
+
+                for accessor_index, data in index_buffers:
+                    accessor = self.json["accessors"][accessor_index]
+
+                    # Reordered indices have the same size so they replace old ones if nothing else reads them
+                    if accessor["bufferView"] in inplace_views:
+                        self.buffers[accessor["bufferView"]].write(
+                            accessor.get("byteOffset", 0), data)
+                        continue
+
+                    accessor["bufferView"] = self.add_buffer_view(data)
+                    accessor.pop("byteOffset", None)
+
+                triangles_count += statistics[0]
+                misses_before += statistics[1]
+                misses_after += statistics[2]
+
+        if triangles_count:
+            self.statistics.append(
+                f"Vertex cache ACMR: {misses_before / triangles_count:.3f} -> {misses_after / triangles_count:.3f}")
+
+        if (self.quantize):
+            self.create_dequantization_nodes(mesh_infos, transforms)
+
+    def get_optimizable_primitives(self, info_primitives: dict[int, list[dict]]) -> set[int]:
+        """Returns mesh data infos which primitives can be reordered"""
+        accessors: list[dict] = self.json["accessors"]
+
+        # Index buffers shared between different vertex data can't be remapped
+        accessor_infos: dict[int, set] = {}
+        for idx, primitives in info_primitives.items():
+            for primitive in primitives:
+                accessor_infos.setdefault(
+                    primitive["indices"], set()).add(idx)
+
+        result = set()
+        for idx, primitives in info_primitives.items():
+            if any(primitive.get("mode", 4) != 4 for primitive in primitives):
+                continue
+
+            if any(len(accessor_infos[primitive["indices"]]) != 1 or accessors[primitive["indices"]]["count"] % 3 != 0 for primitive in primitives):
+                continue
+
+            result.add(idx)
+
+        return result
+
+    def get_rewritable_views(self, rewritten_accessors: set[int]) -> set[int]:
+        """Returns buffer views which are read only by given accessors, so data of accessors can be replaced inside of them"""
+        views: dict[int, bool] = {}
+        excluded_views = {image.get("bufferView")
+                          for image in self.json.get("images", [])}
+        excluded_views.add(self.odin_buffer_index)
+
+        ranges: dict[int, list[tuple[int, int]]] = {}
+        for i, accessor in enumerate(self.json.get("accessors", [])):
+            sparse: dict = accessor.get("sparse")
+            if sparse is not None:
+                excluded_views.add(sparse["indices"]["bufferView"])
+                excluded_views.add(sparse["values"]["bufferView"])
+
+            view = accessor.get("bufferView")
+            if view is None:
+                continue
+
+            views[view] = views.get(view, True) and i in rewritten_accessors
+            offset = accessor.get("byteOffset", 0)
+            ranges.setdefault(view, []).append((offset, offset + accessor["count"] * ComponentType.get_size(
+                accessor["componentType"]) * DataType.num_elements(accessor["type"])))
+
+        result = set()
+        for view, rewritable in views.items():
+            if not rewritable or view in excluded_views or self.buffers[view].stride is not None:
+                continue
+
+            # Accessors which share bytes would overwrite each other
+            view_ranges = sorted(ranges[view])
+            if any(end > start for (_, end), (start, _) in zip(view_ranges, view_ranges[1:])):
+                continue
+
+            result.add(view)
+
+        return result
+
+    def optimize_odin_primitives(self, decoded: list, primitives: list[dict], count: int) -> tuple[list, list[tuple[int, bytes]], tuple[int, float, float]]:
+        """
+        Reorders triangles and vertices of primitives which share the same vertex data
+
+        :return: Remapped attributes, new index buffers data and triangles count with cache misses before and after optimization
+        """
+        index_accessors = list(dict.fromkeys(
+            primitive["indices"] for primitive in primitives))
+
+        positions = next((
+            array.view(np.float32) for attribute, _, array in decoded
+            if attribute.type == OdinAttributeType.a_pos and attribute.format == OdinAttributeFormat.FloatVector3
+        ), None)
+
+        triangles_count = 0
+        misses_before = 0.0
+        misses_after = 0.0
+
+        index_buffers: list[np.array] = []
+        for accessor_index in index_accessors:
+            indices = self.decode_accessor(accessor_index).reshape(-1)
+            before = average_cache_miss_ratio(indices)
+
+            optimized, clusters = optimize_vertex_cache(indices, count)
+            after = average_cache_miss_ratio(optimized)
+
+            # Cluster sorting is accepted only if it doesn't hurt vertex cache too much
+            if positions is not None:
+                sorted_indices = optimize_overdraw(
+                    optimized, clusters, positions)
+                sorted_acmr = average_cache_miss_ratio(sorted_indices)
+                if sorted_acmr <= after * OverdrawThreshold:
+                    optimized, after = sorted_indices, sorted_acmr
+
+            index_buffers.append(optimized)
+            triangle_count = len(indices) // 3
+            triangles_count += triangle_count
+            misses_before += before * triangle_count
+            misses_after += after * triangle_count
+
+        order = optimize_vertex_fetch(index_buffers, count)
+        remap = np.empty(count, dtype=np.int64)
+        remap[order] = np.arange(count)
+
+        decoded = [
+            (attribute, accessor, array[order])
+            for attribute, accessor, array in decoded
+        ]
+
+        index_data = [
+            (accessor_index, remap[indices].astype(indices.dtype).tobytes())
+            for accessor_index, indices in zip(index_accessors, index_buffers)
+        ]
+
+        return decoded, index_data, (triangles_count, misses_before, misses_after)
+
+    def create_dequantization_transforms(self, infos, mesh_infos: dict[int, set], plain_meshes: set[int], decode_positions) -> dict[int, tuple[list[float], float]]:
+        """Returns position dequantization transform of every mesh data info which positions can be quantized"""
+        nodes: list[dict] = self.json.get("nodes", [])
+
+        # Meshes that share vertex data must share position dequantization transform too
+        groups = {idx: idx for idx in infos}
+
+        def find_group(idx) -> int:
+            while groups[idx] != idx:
+                idx = groups[idx]
+            return idx
+
+        for mesh_data_infos in mesh_infos.values():
+            first, *other = mesh_data_infos
+            for idx in other:
+                groups[find_group(idx)] = find_group(first)
+
+        # Node transform is ignored for skinned meshes and can not be applied to regular primitives,
+        # so positions of such meshes are kept in float
+        float_meshes = plain_meshes | {
+            node["mesh"] for node in nodes if "mesh" in node and "skin" in node
+        }
+        float_groups = {
+            find_group(idx)
+            for mesh, mesh_data_infos in mesh_infos.items() if mesh in float_meshes
+            for idx in mesh_data_infos
+        }
+
+        # Only bounds of each info are kept, so positions are not held in memory all at once
+        bounds: dict[int, list[np.array]] = {}
+        for idx in groups:
+            group = find_group(idx)
+            if group in float_groups:
+                continue
+
+            for attribute, _, array in decode_positions(idx):
+                if attribute.format != OdinAttributeFormat.FloatVector3:
+                    continue
 
-            self.cached_mesh_descriptors[idx] = attributes
+                positions = array.view(np.float32)
+                bounds.setdefault(group, []).append(
+                    np.stack([np.min(positions, axis=0), np.max(positions, axis=0)]))
+
+        dequantization = {
+            group: position_dequantization(group_bounds)
+            for group, group_bounds in bounds.items()
+        }
+
+        return {
+            idx: dequantization[find_group(idx)]
+            for idx in groups if find_group(idx) in dequantization
+        }
+
+    def create_dequantization_nodes(self, mesh_infos: dict[int, set], transforms: dict[int, tuple[list[float], float]]) -> None:
+        nodes: list[dict] = self.json.get("nodes", [])
+
+        # Dequantization is moved to new child node so it doesn't interfere with animated or inherited transforms
+        mesh_transforms = {
+            mesh: transforms[next(iter(infos))]
+            for mesh, infos in mesh_infos.items() if next(iter(infos)) in transforms
+        }
+        for node in nodes[:]:
+            mesh = node.get("mesh")
+            if mesh not in mesh_transforms:
+                continue
+
+            translation, scale = mesh_transforms[mesh]
+            nodes.append({
+                "mesh": node.pop("mesh"),
+                "translation": translation,
+                "scale": [scale, scale, scale]
+            })
+            node["children"] = node.get("children", []) + [len(nodes) - 1]
+
+        for key in ["extensionsUsed", "extensionsRequired"]:
+            extensions: list[str] = self.json.setdefault(key, [])
+            if "KHR_mesh_quantization" not in extensions:
+                extensions.append("KHR_mesh_quantization")
+
+    def quantize_odin_attribute(self, attribute: OdinAttribute, accessor: dict, array: np.array, position_transform: tuple[list[float], float] | None) -> tuple[OdinAttribute, dict, np.array]:
+        """Converts decoded attribute to normalized integer form allowed by KHR_mesh_quantization"""
+        match(attribute.type, attribute.format):
+            case (OdinAttributeType.a_pos, OdinAttributeFormat.FloatVector3):
+                if position_transform is None:
+                    return (attribute, accessor, array)
+
+                array = quantize_positions(
+                    array.view(np.float32), *position_transform)
+                accessor["componentType"] = 5122
+
+            case (OdinAttributeType.a_normal, OdinAttributeFormat.FloatVector3):
+                array = quantize_snorm(array.view(np.float32), np.int8)
+                accessor["componentType"] = 5120
+
+            case (OdinAttributeType.a_normal, OdinAttributeFormat.UByteVector3):
+                # Already stored as signed bytes, only interpretation is changed
+                pass
+
+            case (OdinAttributeType.a_tangent, OdinAttributeFormat.UByteVector4):
+                array = quantize_tangents(array / 255.0 * 2.0 - 1.0)
+                accessor["componentType"] = 5120
+
+            case (OdinAttributeType.a_uv0 | OdinAttributeType.a_uv1, OdinAttributeFormat.FloatVector2):
+                # Coordinates outside of 0-1 range would require KHR_texture_transform
+                if np.min(array, initial=0.0) < 0.0 or np.max(array, initial=0.0) > 1.0:
+                    return (attribute, accessor, array)
+
+                array = quantize_unorm(array, np.uint16)
+                accessor["componentType"] = 5123
+
+            case (OdinAttributeType.a_boneweights, OdinAttributeFormat.NormalizedWeightVector):
+                array = quantize_weights(array)
+                accessor["componentType"] = 5121
+
+            case _:
+                return (attribute, accessor, array)
+
+        # Vertex attribute elements must be aligned to 4 bytes
+        padding = (-array.shape[1] * array.itemsize % 4) // array.itemsize
+        if padding:
+            array = np.pad(array, ((0, 0), (0, padding)))
+
+        accessor["normalized"] = True
+        return (attribute, accessor, array)
 
     def process_meshes(self) -> None:
         meshes: list[dict] = self.json.get("meshes", [])
@@ -244,256 +689,237 @@ class SupercellOdinGLTF:
         primitive["attributes"] = attributes
 
     def process_odin_primitive_descriptor(self, descriptor: dict, attributes: dict, positions_count: int):
-        attribute_descriptor: list[OdinAttribute] = []
-        attribute_buffers: list[np.array] = []
-        attribute_accessors: list[np.array] = []
-
-        offset = descriptor["offset"]
-        stride = descriptor["stride"]
-
-        for i, attribute in enumerate(descriptor["attributes"]):
-            attribute_type_index = attribute["index"]
-            attribute_format_index = attribute["format"]
-            if (attribute_type_index not in list(OdinAttributeType)):
-                print(
-                    f"Unknown attribute name \"{attribute.get('name')}\". Skip...")
-                continue
+        self.emit_odin_attributes(
+            self.decode_odin_primitive_descriptor(descriptor, positions_count),
+            attributes
+        )
 
-            if (attribute_format_index not in list(OdinAttributeFormat)):
-                print(
-                    f"Unknown format \"{attribute_format_index}\" in attribute \"{attribute.get('name')}\". Skip...")
-                continue
+    def decode_odin_primitive_descriptor(self, descriptor: dict, positions_count: int, attribute_types: set | None = None) -> list[tuple[OdinAttribute, dict, np.array]]:
+        """
+        Reads descriptor attributes from odin buffer. Does not modify glTF data so it can be called from several threads
 
-            attribute_type = OdinAttributeType(attribute_type_index)
-            attribute_format = OdinAttributeFormat(attribute_format_index)
-            isInteger = attribute.get("interpretAsInteger")
-            attribute = OdinAttribute(
-                attribute_type,
-                attribute_format,
-                attribute["offset"]
-            )
+        :param attribute_types: Types of attributes to read, all attributes are read if not specified
+        """
+        layout = self.get_vertex_layout(descriptor)
 
-            attribute_buffers.append(np.zeros(
-                (positions_count, attribute.elements_count), dtype=attribute.data_type))
-            attribute_descriptor.append(attribute)
-            accessor = {
-                "bufferView": len(self.buffers) + i,
-                "componentType": OdinAttributeFormat.to_accessor_component(attribute_format),
-                "count": int(positions_count),
-                "type": OdinAttributeFormat.to_accessor_type(attribute_format)
-            }
-            if isInteger is not None:
-                accessor["normalized"] = isInteger == False
-            else:
-                accessor["normalized"] = OdinAttributeFormat.is_normalized(
-                    attribute_format)
+        # Only vertex data of this descriptor is read from odin buffer
+        mesh_buffer = self.buffers[self.odin_buffer_index].read(
+            descriptor["offset"], layout.stride * int(positions_count))
+
+        return layout.decode(mesh_buffer, int(positions_count), attribute_types)
+
+    def get_vertex_layout(self, descriptor: dict) -> OdinVertexLayout:
+        """Returns compiled layout of vertex descriptor and prints its warnings once per file"""
+        layout = get_vertex_layout(descriptor)
+        with self.reported_layouts_lock:
+            if layout in self.reported_layouts:
+                return layout
+            self.reported_layouts.add(layout)
 
-            attribute_accessors.append(accessor)
+        for warning in layout.warnings:
+            print(warning)
 
-        mesh_buffer = self.buffers[self.odin_buffer_index].data
-        for tris_idx in range(positions_count):
-            for attr_idx, attribute in enumerate(attribute_descriptor):
-                value_offset = offset + (stride * tris_idx) + attribute.offset
-                buffer = attribute_buffers[attr_idx]
-                buffer[tris_idx] = attribute.read(mesh_buffer, value_offset)
+        return layout
 
-        for i, attribute in enumerate(attribute_descriptor):
+    def emit_odin_attributes(self, decoded: list[tuple[OdinAttribute, dict, np.array]], attributes: dict) -> None:
+        for attribute, accessor, array in decoded:
             attribute_name = OdinAttributeType.to_attribute_name(
                 attribute.type)
-            attributes[attribute_name] = len(self.json["accessors"]) + i
+            attributes[attribute_name] = len(self.json["accessors"])
 
-            buffer_view = BufferView()
-            buffer_view.data = attribute_buffers[i].tobytes()
-            self.buffers.append(buffer_view)
+            stride = None
+            if array.shape[1] != DataType.num_elements(accessor["type"]):
+                stride = array.shape[1] * array.itemsize
 
-        self.json["accessors"].extend(attribute_accessors)
+            accessor["bufferView"] = self.add_buffer_view(
+                array.tobytes(), stride)
+            self.json["accessors"].append(accessor)
 
     def process_animation(self, descriptor: dict) -> None:
         animations = self.json.get("animations", [])
-        animation = OdinAnimation.Create(self, descriptor)
-
-        # Animation input
-        animation_input_index = None
-        individual_input_index = None
-
-        def create_input_buffer(count: int) -> int:
-            result = len(self.json["accessors"])
-            animation_input_buffer = BinaryReader()
-            for i in range(count):
-                animation_input_buffer.write_float(animation.frame_spf * i)
-            self.json["accessors"].append(
-                {
-                    "bufferView": len(self.buffers),
-                    "componentType": 5126,
-                    "count": count,
-                    "type": "SCALAR"
-                }
-            )
-            buffer_view = BufferView()
-            buffer_view.data = bytes(animation_input_buffer.buffer())
-            self.buffers.append(buffer_view)
-            return result
-
-        if (animation.keyframe_mapping):
-            individual_input_index = {
-                num: 0 for num in animation.keyframe_mapping
-            }
-
-            for num in individual_input_index.keys():
-                individual_input_index[num] = create_input_buffer(num)
-
-        else:
-            animation_input_index = create_input_buffer(
-                animation.keyframe_count)
+        nodes: list[dict] = self.json.get("nodes", [])
+        # In stream mode nodes are decoded one by one and released once their channels are written
+        animation = OdinAnimation.Create(self, descriptor, lazy=self.stream)
 
-        # Animation Transform
-        animation_buffers_indices: list[tuple[int, int, int]] = []
-        animation_transform_buffers: list[list[BinaryReader, BinaryReader, BinaryReader]] = [
-            [BinaryReader() for _ in range(3)] for _ in animation.used_nodes]
+        animation_channels: list[dict] = []
+        animation_samplers: list[dict] = []
 
-        for node_index in range(len(animation.used_nodes)):
-            node_keyframes = animation.keyframe_mapping[
-                node_index] if animation.keyframe_mapping else animation.keyframe_count
+        # Animation input. Channels with the same keyframe times share input accessor
+        input_indices: dict[bytes, int] = {}
+        input_times: dict[int, np.array] = {}
+        resampled_positions: dict[int, np.array] = {}
+
+        def get_input_index(times: np.array) -> int:
+            key = times.tobytes()
+            if key not in input_indices:
+                input_indices[key] = len(self.json["accessors"])
+                self.json["accessors"].append(
+                    {
+                        "bufferView": self.add_buffer_view(key),
+                        "componentType": 5126,
+                        "count": len(times),
+                        "type": "SCALAR"
+                    }
+                )
 
-            for frame_index in range(node_keyframes):
-                translation, rotation, scale = animation_transform_buffers[node_index]
-                t, r, s = animation.get_frame_data(node_index, frame_index)
+            return input_indices[key]
+
+        # Channels are collected as (node, path, accessor type, key times, key values)
+        pending_channels: list[tuple[int, str, str, np.array, np.array]] = []
+        keys_before = 0
+        keys_after = 0
+        max_errors: dict[str, float] = {}
+
+        def emit_channels() -> None:
+            nonlocal keys_before, keys_after
+
+            if self.animation_tolerance is not None:
+                for (path, _), tolerance in zip(AnimationPaths, self.animation_tolerance):
+                    channels = [
+                        i for i, channel in enumerate(pending_channels)
+                        if channel[1] == path and len(channel[3]) > 1
+                    ]
+                    kept_keys, max_error = reduce_keys(
+                        [pending_channels[i][3:] for i in channels], path, tolerance)
+                    max_errors[path] = max(
+                        max_errors.get(path, 0.0), max_error)
+
+                    for i, keys in zip(channels, kept_keys):
+                        node_index, path, accessor_type, key_times, key_values = pending_channels[i]
+                        keys_before += len(key_times)
+                        keys_after += len(keys)
+                        pending_channels[i] = (
+                            node_index, path, accessor_type, key_times[keys], key_values[keys])
+
+            for node_index, path, accessor_type, key_times, key_values in pending_channels:
+                output_index = len(self.json["accessors"])
+                self.json["accessors"].append(
+                    {
+                        "bufferView": self.add_buffer_view(key_values.tobytes()),
+                        "componentType": 5126,
+                        "count": len(key_values),
+                        "type": accessor_type
+                    }
+                )
 
-                for value in t:
-                    translation.write_float(value)
+                animation_channels.append(
+                    {
+                        "sampler": len(animation_samplers),
+                        "target": {
+                            "node": node_index,
+                            "path": path
+                        }
+                    }
+                )
+                animation_samplers.append(
+                    {
+                        "input": get_input_index(key_times),
+                        "output": output_index
+                    }
+                )
 
-                for value in r:
-                    rotation.write_float(value)
+            pending_channels.clear()
 
-                for value in s:
-                    scale.write_float(value)
+        # Animation Transform
+        # Channels of all nodes are reduced together, in stream mode each node is written right after decoding
+        for node_number, node_index in enumerate(animation.used_nodes):
+            node_keyframes = animation.keyframe_mapping[
+                node_number] if animation.keyframe_mapping else animation.keyframe_count
+
+            if node_keyframes not in input_times:
+                input_times[node_keyframes] = (np.arange(node_keyframes, dtype=np.float64)
+                                               * animation.frame_spf).astype(np.float32)
+            times = input_times[node_keyframes]
+
+            # Nodes with frametime have their own key times
+            frame_times = animation.get_node_frame_times(node_number)
+            if frame_times is not None:
+                times = frame_times[:node_keyframes]
+
+            transforms = [
+                np.ascontiguousarray(array[:node_keyframes], dtype=np.float32)
+                for array in animation.get_node_data(node_number)
+            ]
+
+            key_frames = animation.get_node_key_frames(node_number)
+
+            # Curves are resampled to requested frame rate so key frames of source are not valid anymore.
+            # Uniform clips which already have the same or lower frame rate are kept as is
+            resampled = self.animation_fps is not None and node_keyframes > 1 and (
+                frame_times is not None or self.animation_fps < animation.frame_rate)
+            if resampled:
+                if frame_times is not None:
+                    positions = resample_time_positions(times, self.animation_fps)
+                else:
+                    if node_keyframes not in resampled_positions:
+                        resampled_positions[node_keyframes] = resample_positions(
+                            node_keyframes, animation.frame_rate, self.animation_fps)
+                    positions = resampled_positions[node_keyframes]
+
+                transforms = [
+                    resample(values, positions, PathInterpolation[path]).astype(np.float32)
+                    for (path, _), values in zip(AnimationPaths, transforms)
+                ]
+                if frame_times is not None:
+                    times = np.interp(positions, np.arange(len(times)), times).astype(np.float32)
+                else:
+                    times = (positions * animation.frame_spf).astype(np.float32)
+                key_frames = None
 
-        for idx, buffer in enumerate(animation_transform_buffers):
-            translation, rotation, scale = buffer
-            base_accessor_index = len(self.json["accessors"])
-            base_bufferView_index = len(self.buffers)
-            node_keyframes = animation.keyframe_mapping[idx] \
-                if animation.keyframe_mapping else animation.keyframe_count
+            if key_frames is None:
+                key_frames = np.arange(len(times))
 
-            # Translation
-            self.json["accessors"].append(
-                {
-                    "bufferView": base_bufferView_index,
-                    "componentType": 5126,
-                    "count": node_keyframes,
-                    "type": "VEC3"
-                }
-            )
-            translation_buffer_view = BufferView()
-            translation_buffer_view.data = bytes(translation.buffer())
-            self.buffers.append(translation_buffer_view)
+            for (path, accessor_type), values in zip(AnimationPaths, transforms):
+                if len(values) == 0:
+                    continue
 
-            # Rotation
-            self.json["accessors"].append(
-                {
-                    "bufferView": base_bufferView_index + 1,
-                    "componentType": 5126,
-                    "count": node_keyframes,
-                    "type": "VEC4"
-                }
-            )
-            rotation_buffer_view = BufferView()
-            rotation_buffer_view.data = bytes(rotation.buffer())
-            self.buffers.append(rotation_buffer_view)
+                # Channels which are not animated are written as single keyframe or not written at all if they match node transform
+                if not animation.store.has_channel(node_number, PathChannels[path]) or (values == values[0]).all():
+                    if self.is_rest_transform(nodes[node_index], path, values[0]):
+                        continue
 
-            # Scale
-            self.json["accessors"].append(
-                {
-                    "bufferView": base_bufferView_index + 2,
-                    "componentType": 5126,
-                    "count": node_keyframes,
-                    "type": "VEC3"
-                }
-            )
-            scale_buffer_view = BufferView()
-            scale_buffer_view.data = bytes(scale.buffer())
-            self.buffers.append(scale_buffer_view)
-
-            animation_buffers_indices.append(
-                [
-                    base_accessor_index,
-                    base_accessor_index + 1,
-                    base_accessor_index + 2
-                ]
-            )
+                    key_times, key_values = times[:1], values[:1]
+                else:
+                    channel_frames = reduce_hold_keys(key_frames, values)
+                    key_times, key_values = times[channel_frames], values[channel_frames]
 
-        # Animation channels
-        animation_channels: list[dict] = []
-        animation_samplers: list[dict] = []
-        for node_number, node_index in enumerate(animation.used_nodes):
-            translation, rotation, scale = animation_buffers_indices[node_number]
+                pending_channels.append(
+                    (node_index, path, accessor_type, key_times, key_values))
 
-            input_index = individual_input_index[animation.keyframe_mapping[node_number]] \
-                if animation.keyframe_mapping else animation_input_index
+            if self.stream:
+                emit_channels()
+                animation.release_node(node_number)
 
-            # Translation
-            animation_channels.append(
-                {
-                    "sampler": len(animation_samplers),
-                    "target": {
-                        "node": node_index,
-                        "path": "translation"
-                    }
-                }
-            )
-            animation_samplers.append(
-                {
-                    "input": input_index,
-                    "output": translation
-                }
-            )
+        emit_channels()
 
-            # Rotation
-            animation_channels.append(
-                {
-                    "sampler": len(animation_samplers),
-                    "target": {
-                        "node": node_index,
-                        "path": "rotation"
-                    }
-                }
-            )
-            animation_samplers.append(
-                {
-                    "input": input_index,
-                    "output": rotation
-                }
-            )
+        if keys_before:
+            errors = ", ".join(
+                f"{path} {max_errors[path]:.4g}" for path, _ in AnimationPaths)
+            self.statistics.append(
+                f"Animation keyframes: {keys_before} -> {keys_after}, max error: {errors}")
 
-            # Scale
-            animation_channels.append(
-                {
-                    "sampler": len(animation_samplers),
-                    "target": {
-                        "node": node_index,
-                        "path": "scale"
-                    }
-                }
-            )
-            animation_samplers.append(
+        if animation_channels:
+            animations.append(
                 {
-                    "input": input_index,
-                    "output": scale
+                    "name": "clip",
+                    "channels": animation_channels,
+                    "samplers": animation_samplers
                 }
             )
 
-        animations.append(
-            {
-                "name": "clip",
-                "channels": animation_channels,
-                "samplers": animation_samplers
-            }
-        )
-
         self.json["animations"] = animations
 
         self.process_animation_skin(animation.used_nodes)
 
+    @staticmethod
+    def is_rest_transform(node: dict, path: str, value: np.array) -> bool:
+        """Checks if animated value is exactly the same as node transform"""
+        if "matrix" in node:
+            return False
+
+        rest = node.get(path, NodeRestTransform[path])
+        return np.array_equal(value.astype(np.float64), rest)
+
     def process_animation_skin(self, nodes: list[int]) -> None:
         skins: list[dict] = self.json.get("skins", [])
 
@@ -502,18 +928,11 @@ class SupercellOdinGLTF:
             if (all(joints) and all(nodes)):
                 return
 
-        new_skin_joints: list[int] = []
+        if self.scene_graph is None:
+            self.scene_graph = SceneGraph.from_odin_nodes(self.json["nodes"])
 
-        def add_skin_joint(idx: int):
-            node = self.json["nodes"][idx]
-            childrens = node.get("children", [])
-            for children in childrens:
-                add_skin_joint(children)
-            if (idx not in new_skin_joints):
-                new_skin_joints.append(idx)
-
-        for node in nodes:
-            add_skin_joint(node)
+        # Joints are collected in post order, children of node go before it
+        new_skin_joints = self.scene_graph.collect_subtrees(nodes).tolist()
 
         skins.append({
             "joints": new_skin_joints
@@ -546,40 +965,176 @@ class SupercellOdinGLTF:
         self.json["extensionsRequired"].extend(
             SupercellOdinGLTF.RequiredExtensions)
 
-    def save_buffers(self) -> bytes:
-        stream = BinaryReader()
+    def add_buffer_view(self, data: bytes, stride: int | None = None) -> int:
+        """Appends new buffer view and returns its index"""
+        if self.storage is not None:
+            buffer_view = SpilledBufferView(self.storage, data, stride)
+        else:
+            buffer_view = BufferView()
+            buffer_view.stride = stride
+            buffer_view.data = data
+
+        self.buffers.append(buffer_view)
+        return len(self.buffers) - 1
+
+    def save_buffers(self) -> bytes | BufferStorageLayout:
+        storage = self.storage_layout() if self.storage is not None else None
+        stream = BinaryReader() if storage is None else None
 
         buffers: list[dict] = []
         bufferView: list[dict] = []
+        buffer_length = 0
+        fallback_length = 0
 
         for buffer in self.buffers:
-            buffer.offset = stream.pos()
+            buffer.offset = buffer_length
+            if isinstance(buffer, CompressedBufferView):
+                buffer.fallback_offset = fallback_length
+                fallback_length += buffer.fallback_length + \
+                    (-buffer.fallback_length % 16)
+
             bufferView.append(
                 buffer.serialize()
             )
 
-            stream.write_bytes(buffer.data)
-            stream.pad(-len(buffer.data) % 16)
+            if stream is not None:
+                stream.write_bytes(buffer.data)
+                stream.pad(-len(buffer.data) % 16)
+
+            buffer_length += buffer.byte_length + (-buffer.byte_length % 16)
 
         buffers.append(
             {
-                "byteLength": len(stream.buffer())
+                "byteLength": buffer_length
             }
         )
 
+        # Compressed views are decoded by loader into buffer without data
+        if fallback_length:
+            buffers.append(
+                {
+                    "byteLength": fallback_length,
+                    "extensions": {
+                        "EXT_meshopt_compression": {
+                            "fallback": True
+                        }
+                    }
+                }
+            )
+
         self.json["buffers"] = buffers
         self.json["bufferViews"] = bufferView
 
+        if storage is not None:
+            return storage
+
         return bytes(stream.buffer())
 
+    def storage_layout(self) -> BufferStorageLayout:
+        """Returns parts of storage which hold buffer views in output order.
+        Views are not copied, only views which are not in storage yet are appended to it"""
+        layout = BufferStorageLayout(self.storage)
+        for buffer in self.buffers:
+            view = buffer.payload if isinstance(
+                buffer, CompressedBufferView) else buffer
+            if not isinstance(view, SpilledBufferView) or view.storage is not self.storage:
+                view = SpilledBufferView(self.storage, view.data)
+
+            layout.append(view.storage_offset, view.length)
+
+        return layout
+
+    def compress_buffers(self) -> None:
+        meshes: list[dict] = self.json.get("meshes", [])
+        accessors: list[dict] = self.json.get("accessors", [])
+
+        index_accessors = {
+            primitive["indices"]
+            for mesh in meshes for primitive in mesh.get("primitives", []) if "indices" in primitive
+        }
+
+        # Views that are used by anything except regular accessors are kept as is
+        excluded_views = {
+            image.get("bufferView") for image in self.json.get("images", [])
+        }
+        view_accessors: dict[int, list[tuple[int, dict]]] = {}
+        for i, accessor in enumerate(accessors):
+            sparse: dict = accessor.get("sparse")
+            if sparse is not None:
+                excluded_views.add(accessor.get("bufferView"))
+                excluded_views.add(sparse["indices"]["bufferView"])
+                excluded_views.add(sparse["values"]["bufferView"])
+                continue
+
+            if accessor.get("bufferView") is not None:
+                view_accessors.setdefault(
+                    accessor["bufferView"], []).append((i, accessor))
+
+        compressed_count = 0
+        for view_index, users in view_accessors.items():
+            if view_index in excluded_views:
+                continue
+
+            buffer = self.buffers[view_index]
+            buffer_data = buffer.data
+            length = len(buffer_data)
+
+            if all(i in index_accessors for i, _ in users):
+                component_types = {accessor["componentType"]
+                                   for _, accessor in users}
+                if len(component_types) != 1 or not component_types <= {5123, 5125}:
+                    continue
+
+                component_type = component_types.pop()
+                stride = ComponentType.get_size(component_type)
+                if length % stride != 0:
+                    continue
+
+                count = length // stride
+                data = encode_index_sequence(np.frombuffer(
+                    buffer_data, dtype=ComponentType.to_numpy_dtype(component_type), count=count))
+                mode = "INDICES"
+
+            elif len(users) == 1 and users[0][0] not in index_accessors:
+                accessor = users[0][1]
+                if accessor.get("byteOffset"):
+                    continue
+
+                element_size = ComponentType.get_size(
+                    accessor["componentType"]) * DataType.num_elements(accessor["type"])
+                stride = buffer.stride or element_size
+                count = accessor["count"]
+                if stride % 4 != 0 or stride > 256 or count * stride != length:
+                    continue
+
+                data = encode_vertex_buffer(buffer_data, count, stride)
+                mode = "ATTRIBUTES"
+
+            else:
+                continue
+
+            if len(data) >= length:
+                continue
+
+            self.buffers[view_index] = CompressedBufferView(
+                buffer, data, count, stride, mode, self.storage)
+            compressed_count += 1
+
+        if compressed_count == 0:
+            return
+
+        for key in ["extensionsUsed", "extensionsRequired"]:
+            extensions: list[str] = self.json.setdefault(key, [])
+            if "EXT_meshopt_compression" not in extensions:
+                extensions.append("EXT_meshopt_compression")
+
     def create_scene(self) -> None:
         # looking for root nodes
-        nodes: list[dict] = self.json.get("nodes", [])
-        childrens = set()
-        for node in nodes:
-            childrens.update(node.get("children", []))
+        if self.scene_graph is None:
+            self.scene_graph = SceneGraph.from_odin_nodes(
+                self.json.get("nodes", []))
 
-        root_nodes = [i for i in range(len(nodes)) if i not in childrens]
+        root_nodes = self.scene_graph.roots.tolist()
         self.json["scenes"] = [{
             "nodes": root_nodes
         }]
@@ -595,7 +1150,7 @@ class SupercellOdinGLTF:
         bufferViews: list[dict] = self.json["bufferViews"]
         assert (len(buffers) == 1)
 
-        stream = BinaryReader(data)
+        binary = memoryview(data)
 
         for bufferView in bufferViews:
             buffer_index = bufferView.get("buffer")
@@ -604,15 +1159,18 @@ class SupercellOdinGLTF:
             offset = bufferView.get("byteOffset", 0)
             length = bufferView.get("byteLength")
 
-            stream.seek(offset)
-            data = stream.read_bytes(length)
+            # Views are copied to temporary storage in stream mode so source data can stay memory mapped
+            data = binary[offset:offset + length]
+            if self.storage is None:
+                data = bytes(data)
 
-            buffer = BufferView()
-            buffer.stride = bufferView.get("byteStride", None)
-            buffer.data = data
-            self.buffers.append(buffer)
+            self.add_buffer_view(data, bufferView.get("byteStride", None))
 
     def save(self) -> glTF:
+        """Creates output file. In stream mode binary chunk refers to temporary storage, so file must be written before close"""
+        if (self.meshopt):
+            self.compress_buffers()
+
         data = self.save_buffers()
 
         file = glTF()
@@ -623,6 +1181,11 @@ class SupercellOdinGLTF:
 
         return file
 
+    def close(self) -> None:
+        """Removes temporary storage of stream mode"""
+        if self.storage is not None:
+            self.storage.close()
+
     def decode_accessor(self, index: int) -> np.array:
         return self.decode_accessor_obj(self.json["accessors"][index])
 
@@ -637,14 +1200,14 @@ class SupercellOdinGLTF:
 
         buffer_view_index = accessor.get("bufferView")
         if buffer_view_index is not None:
-            bufferView = self.json["bufferViews"][buffer_view_index]
-            buffer_data = self.buffers[buffer_view_index].data
+            buffer_view = self.buffers[buffer_view_index]
+            buffer_data = buffer_view.data
 
             accessor_offset = accessor.get("byteOffset") or 0
 
             bytes_per_elem = dtype(1).nbytes
             default_stride = bytes_per_elem * component_nb
-            stride = bufferView.get("byteStride") or default_stride
+            stride = buffer_view.stride or default_stride
 
             if stride == default_stride:
                 array = np.frombuffer(
@@ -662,18 +1225,19 @@ class SupercellOdinGLTF:
                 # One XXXpp group is one stride's worth of data.
                 assert stride % bytes_per_elem == 0
                 elems_per_stride = stride // bytes_per_elem
-                num_elems = (accessor.count - 1) * \
+                num_elems = (accessor.get("count") - 1) * \
                     elems_per_stride + component_nb
 
                 array = np.frombuffer(
                     buffer_data,
                     dtype=np.dtype(dtype).newbyteorder('<'),
                     count=num_elems,
+                    offset=accessor_offset
                 )
                 assert array.strides[0] == bytes_per_elem
                 array = np.lib.stride_tricks.as_strided(
                     array,
-                    shape=(accessor.count, component_nb),
+                    shape=(accessor.get("count"), component_nb),
                     strides=(stride, bytes_per_elem),
                 )
 
@@ -684,13 +1248,14 @@ class SupercellOdinGLTF:
 
         # Normalization
         if accessor.get("normalized"):
-            if accessor.component_type == 5120:  # int8
+            component_type = accessor.get("componentType")
+            if component_type == 5120:  # int8
                 array = np.maximum(-1.0, array / 127.0)
-            elif accessor.component_type == 5121:  # uint8
+            elif component_type == 5121:  # uint8
                 array = array / 255.0
-            elif accessor.component_type == 5122:  # int16
+            elif component_type == 5122:  # int16
                 array = np.maximum(-1.0, array / 32767.0)
-            elif accessor.component_type == 5123:  # uint16
+            elif component_type == 5123:  # uint16
                 array = array / 65535.0
 
             array = array.astype(np.float32, copy=False)
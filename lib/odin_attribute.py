@@ -19,22 +19,29 @@ class OdinAttribute:
     def elements_count(self) -> int:
         return self._elements_count
 
-    def read(self, data: bytes, offset: int) -> np.array:
+    @property
+    def field_format(self) -> tuple:
+        """Returns dtype and shape of attribute as field of vertex structure"""
+        if self.format == OdinAttributeFormat.NormalizedWeightVector:
+            return (np.uint32, ())
+
+        return (self._dtype, (self._elements_count, ))
+
+    def unpack(self, values: np.array) -> np.array:
+        """Converts raw values of attribute field to (count, elements) array"""
         match(self.format):
             case OdinAttributeFormat.NormalizedWeightVector:
-                value = np.frombuffer(
-                    data, dtype=np.uint32, offset=offset, count=1)[0]
-                x = (value >> 21) * 0.0002442
-                y = ((value >> 10) & 0x7FF) * 0.0002442
-                z = (value & 0x3FF) * 0.0002442
-                array = np.array([
+                x = (values >> 21) * 0.0002442
+                y = ((values >> 10) & 0x7FF) * 0.0002442
+                z = (values & 0x3FF) * 0.0002442
+                array = np.stack([
                     ((1.0 - x) - y) - z,
                     x,
                     y,
                     z
-                ], dtype=self._dtype)
+                ], axis=1).astype(self._dtype)
             case _:
-                array = np.frombuffer(
-                    data, dtype=self._dtype, offset=offset, count=self._elements_count)
+                array = np.array(values, dtype=self._dtype).reshape(
+                    len(values), self._elements_count)
 
         return array
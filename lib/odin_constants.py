@@ -36,6 +36,20 @@ class OdinAttributeType(IntEnum):
             # OdinAttributeType.a_colorMul: 'COLOR_2',
         }[component_type]
 
+    @classmethod
+    def from_attribute_name(cls, name: str):
+        return {
+            'POSITION': OdinAttributeType.a_pos,
+            'NORMAL': OdinAttributeType.a_normal,
+            'JOINTS_0': OdinAttributeType.a_boneindex,
+            'WEIGHTS_0': OdinAttributeType.a_boneweights,
+            'TEXCOORD_0': OdinAttributeType.a_uv0,
+            'TEXCOORD_1': OdinAttributeType.a_uv1,
+            'COLOR_0': OdinAttributeType.a_color,
+            'COLOR_1': OdinAttributeType.a_color1,
+            'TANGENT': OdinAttributeType.a_tangent
+        }.get(name)
+
 
 class OdinAttributeFormat(IntEnum):
     UByteVector4 = 3
@@ -0,0 +1,473 @@
+from lib.glTF import glTF
+from lib.odin import SupercellOdinGLTF, AnimationPaths, NodeRestTransform
+from lib.odin_constants import OdinAttributeFormat, OdinAttributeType
+from lib.animation.interpolation import PathInterpolation, resample
+from lib.animation.packedWriter import OdinPackedWriter
+import numpy as np
+
+# Odin formats that are used for packing of regular glTF attributes
+PackedAttributeFormats = {
+    OdinAttributeType.a_pos: OdinAttributeFormat.FloatVector3,
+    OdinAttributeType.a_normal: OdinAttributeFormat.UByteVector3,
+    OdinAttributeType.a_uv0: OdinAttributeFormat.FloatVector2,
+    OdinAttributeType.a_uv1: OdinAttributeFormat.FloatVector2,
+    OdinAttributeType.a_boneindex: OdinAttributeFormat.UByteVector4,
+    OdinAttributeType.a_boneweights: OdinAttributeFormat.NormalizedWeightVector,
+    OdinAttributeType.a_color: OdinAttributeFormat.ColorRGBA,
+}
+
+# Scale of packed weight components, same as in OdinAttribute.unpack
+WeightScale = 0.0002442
+
+# Accessors of packed animation descriptor
+PackedAnimationAccessors = ["dataAccessor", "nodeAccessor", "uintAccessor"]
+
+# Extensions which do not refer to accessors or buffer views, or which references are remapped by encoder.
+# Data of files with other extensions is not removed since it can be used by them
+PrunableExtensions = {
+    "SC_odin_format",
+    "SC_shader",
+    "EXT_mesh_gpu_instancing",
+    "KHR_mesh_quantization",
+    "KHR_lights_punctual",
+    "KHR_texture_transform",
+    "KHR_texture_basisu",
+    "EXT_texture_webp",
+}
+
+# Frame rate of packed animation if it can not be taken from keyframe times
+DefaultFrameRate = 30
+MaxFrameRate = 120
+
+
+def pack_weights(weights: np.array) -> np.array:
+    """
+    Packs weights sorted in descending order into NormalizedWeightVector.
+    First weight is not stored and restored as one minus the rest
+    """
+    quantized = np.round(weights[:, 1:] / WeightScale).astype(np.int64)
+    quantized = np.clip(quantized, 0, [0x7FF, 0x7FF, 0x3FF])
+
+    return ((quantized[:, 0] << 21) | (quantized[:, 1] << 10) | quantized[:, 2]).astype(np.uint32)
+
+
+class SupercellOdinEncoder(SupercellOdinGLTF):
+    """Converts regular glTF data to compact Odin layout"""
+
+    def process(self) -> glTF:
+        self.pack_meshes()
+        self.pack_animation()
+        self.remove_unused_data()
+
+        return self.save()
+
+    def pack_meshes(self) -> None:
+        meshes: list[dict] = self.json.get("meshes", [])
+
+        # Primitives with the same attributes share vertex data
+        groups: dict[tuple, list[dict]] = {}
+        for mesh in meshes:
+            for primitive in mesh.get("primitives", []):
+                if not self.is_packable_primitive(primitive):
+                    continue
+
+                key = tuple(sorted(primitive["attributes"].items()))
+                groups.setdefault(key, []).append(primitive)
+
+        vertex_buffer: list[bytes] = []
+        buffer_length = 0
+        mesh_data_infos: list[dict] = []
+
+        for attributes, primitives in groups.items():
+            arrays = self.read_packable_attributes(dict(attributes))
+            if arrays is None:
+                continue
+
+            descriptor, data = self.pack_vertices(arrays)
+            descriptor["offset"] = buffer_length
+
+            # Keeping vertex data aligned
+            data += bytes(-len(data) % 16)
+            vertex_buffer.append(data)
+            buffer_length += len(data)
+
+            for primitive in primitives:
+                primitive.pop("attributes")
+                extensions: dict = primitive.setdefault("extensions", {})
+                extensions["SC_odin_format"] = {
+                    "meshDataInfoIndex": len(mesh_data_infos)
+                }
+
+            mesh_data_infos.append({
+                "vertexDescriptors": [descriptor]
+            })
+
+        if not mesh_data_infos:
+            return
+
+        odin = self.create_odin_extension()
+        odin["bufferView"] = self.add_buffer_view(b''.join(vertex_buffer))
+        odin["meshDataInfos"] = mesh_data_infos
+
+    def create_odin_extension(self) -> dict:
+        """Returns Odin extension of file, it is created with empty vertex buffer if it does not exist yet"""
+        extensions: dict = self.json.setdefault("extensions", {})
+        if "SC_odin_format" not in extensions:
+            # Decoder always reads vertex buffer, even if there are no meshes
+            extensions["SC_odin_format"] = {"bufferView": self.add_buffer_view(b'')}
+
+        for key in ["extensionsUsed", "extensionsRequired"]:
+            extensions_list: list[str] = self.json.setdefault(key, [])
+            if "SC_odin_format" not in extensions_list:
+                extensions_list.append("SC_odin_format")
+
+        return extensions["SC_odin_format"]
+
+    def is_packable_primitive(self, primitive: dict) -> bool:
+        attributes: dict = primitive.get("attributes")
+        if not attributes or primitive.get("indices") is None:
+            return False
+
+        # Odin vertex count is taken from indices so only triangles are packed
+        if primitive.get("mode", 4) != 4:
+            return False
+
+        return all(
+            OdinAttributeType.from_attribute_name(
+                name) in PackedAttributeFormats
+            for name in attributes
+        )
+
+    def read_packable_attributes(self, attributes: dict) -> dict[OdinAttributeType, np.array] | None:
+        """Returns attribute arrays as floats, except signed byte normals which are returned as raw bytes"""
+        arrays = {}
+        for name, index in attributes.items():
+            attribute_type = OdinAttributeType.from_attribute_name(name)
+            accessor: dict = self.json["accessors"][index]
+
+            # Signed byte normals already have Odin layout, both normalized and integer ones
+            if attribute_type == OdinAttributeType.a_normal and accessor["componentType"] == 5120:
+                accessor = dict(accessor, normalized=False)
+
+            arrays[attribute_type] = self.decode_accessor_obj(accessor)
+
+        if OdinAttributeType.a_pos not in arrays:
+            return None
+
+        joints = arrays.get(OdinAttributeType.a_boneindex)
+        if joints is not None and np.max(joints, initial=0) > 0xFF:
+            return None
+
+        color = arrays.get(OdinAttributeType.a_color)
+        if color is not None and color.shape[1] == 3:
+            arrays[OdinAttributeType.a_color] = np.concatenate(
+                [color, np.ones((len(color), 1), dtype=color.dtype)], axis=1)
+
+        # Only 3 weights are stored and the first one must be the biggest
+        weights = arrays.get(OdinAttributeType.a_boneweights)
+        if weights is not None:
+            weights = weights.astype(np.float64)
+            total = weights.sum(axis=1, keepdims=True)
+            weights = np.divide(weights, total, out=np.zeros_like(
+                weights), where=total > 0)
+
+            order = np.argsort(-weights, axis=1, kind="stable")
+            arrays[OdinAttributeType.a_boneweights] = np.take_along_axis(
+                weights, order, axis=1)
+            if joints is not None:
+                arrays[OdinAttributeType.a_boneindex] = np.take_along_axis(
+                    joints, order, axis=1)
+
+        return arrays
+
+    def pack_vertices(self, arrays: dict[OdinAttributeType, np.array]) -> tuple[dict, bytes]:
+        """Interleaves attribute arrays into single Odin vertex buffer"""
+        count = len(arrays[OdinAttributeType.a_pos])
+
+        descriptor_attributes: list[dict] = []
+        names: list[str] = []
+        formats: list = []
+        offsets: list[int] = []
+        values: list[np.array] = []
+
+        offset = 0
+        for attribute_type in sorted(arrays.keys()):
+            attribute_format = PackedAttributeFormats[attribute_type]
+            dtype = OdinAttributeFormat.to_numpy_dtype(attribute_format)
+            elements_count = OdinAttributeFormat.to_element_count(
+                attribute_format)
+            array = arrays[attribute_type]
+
+            match(attribute_format):
+                case OdinAttributeFormat.FloatVector3 | OdinAttributeFormat.FloatVector2:
+                    # Float vectors are stored as raw bits
+                    value = array.astype(np.float32).view(dtype)
+                case OdinAttributeFormat.UByteVector3 if array.dtype == np.int8:
+                    value = array
+                case OdinAttributeFormat.UByteVector3:
+                    value = np.round(np.clip(array, -1.0, 1.0)
+                                     * 127).astype(dtype)
+                case OdinAttributeFormat.ColorRGBA:
+                    value = np.round(np.clip(array, 0.0, 1.0)
+                                     * 255).astype(dtype)
+                case OdinAttributeFormat.NormalizedWeightVector:
+                    value = pack_weights(array)
+                    dtype = np.uint32
+                    elements_count = 1
+                case _:
+                    value = array.astype(dtype)
+
+            names.append(attribute_type.name)
+            formats.append((dtype, (elements_count, )))
+            offsets.append(offset)
+            values.append(value.reshape(count, elements_count))
+            descriptor_attributes.append({
+                "index": int(attribute_type),
+                "format": int(attribute_format),
+                "offset": offset,
+                "name": attribute_type.name
+            })
+
+            size = np.dtype(dtype).itemsize * elements_count
+            offset += size + (-size % 4)
+
+        vertices = np.zeros(count, dtype=np.dtype({
+            "names": names,
+            "formats": formats,
+            "offsets": offsets,
+            "itemsize": offset
+        }))
+        for name, value in zip(names, values):
+            vertices[name] = value
+
+        return {"stride": offset, "attributes": descriptor_attributes}, vertices.tobytes()
+
+    def pack_animation(self) -> None:
+        """Converts first glTF animation to packed Odin animation"""
+        animations: list[dict] = self.json.get("animations", [])
+        if not animations:
+            return
+
+        # Odin extension has room for single animation only
+        if len(animations) > 1:
+            print(
+                f"Only first of {len(animations)} animations is packed, the rest are kept as glTF animations")
+
+        channels = self.read_animation_channels(animations[0])
+        if not channels:
+            return
+
+        frame_rate = self.get_animation_frame_rate(
+            [times for times, _, _ in channels.values()])
+        duration = max(float(times[-1]) for times, _, _ in channels.values())
+        frame_count = int(round(duration * frame_rate)) + 1
+        frame_times = np.arange(frame_count, dtype=np.float64) / frame_rate
+
+        # Nodes are sampled to dense frames, channels without animation keep node transform
+        nodes: list[dict] = self.json.get("nodes", [])
+        used_nodes = sorted({node_index for node_index, _ in channels})
+        transforms = []
+        for path, _ in AnimationPaths:
+            values = np.empty((len(used_nodes), frame_count, len(NodeRestTransform[path])), dtype=np.float32)
+            for i, node_index in enumerate(used_nodes):
+                channel = channels.get((node_index, path))
+                if channel is None:
+                    values[i] = nodes[node_index].get(path, NodeRestTransform[path])
+                    continue
+
+                times, keys, interpolation = channel
+                if interpolation == "STEP":
+                    positions = np.maximum(np.searchsorted(
+                        times, frame_times, side="right") - 1, 0).astype(np.float64)
+                else:
+                    positions = np.interp(frame_times, times, np.arange(len(times), dtype=np.float64))
+                values[i] = resample(keys, positions, PathInterpolation[path])
+
+            transforms.append(values)
+
+        translation, rotation, scale = transforms
+        packed_nodes, data, base, base_rotation = OdinPackedWriter(
+            translation, rotation, scale).write()
+
+        for node, node_index in zip(packed_nodes, used_nodes):
+            node["nodeIndex"] = node_index
+
+        packed = {
+            "nodes": packed_nodes,
+            "dataAccessor": self.add_accessor(data, 5122),
+            "nodeAccessor": self.add_accessor(base, 5126)
+        }
+        if base_rotation is not None:
+            packed["uintAccessor"] = self.add_accessor(base_rotation, 5125)
+
+        odin = self.create_odin_extension()
+        odin["animation"] = {
+            "frameRate": frame_rate,
+            "keyframesCount": frame_count,
+            "packed": packed
+        }
+
+        animations.pop(0)
+        if not animations:
+            self.json.pop("animations")
+
+    def read_animation_channels(self, animation: dict) -> dict[tuple[int, str], tuple[np.array, np.array, str]]:
+        """Returns key times, values and interpolation of animation channels by node and path"""
+        samplers: list[dict] = animation.get("samplers", [])
+        paths = [path for path, _ in AnimationPaths]
+
+        channels = {}
+        for channel in animation.get("channels", []):
+            target: dict = channel.get("target", {})
+            if target.get("node") is None or target.get("path") not in paths:
+                continue
+
+            sampler = samplers[channel["sampler"]]
+            times = self.decode_accessor(sampler["input"]).reshape(-1).astype(np.float64)
+            values = self.decode_accessor(sampler["output"]).astype(np.float64)
+
+            # Only values of cubic spline keys are used, tangents are dropped
+            interpolation = sampler.get("interpolation", "LINEAR")
+            if interpolation == "CUBICSPLINE":
+                values = values[1::3]
+
+            if len(times) == 0:
+                continue
+
+            channels[(target["node"], target["path"])] = (times, values, interpolation)
+
+        return channels
+
+    @staticmethod
+    def get_animation_frame_rate(times: list[np.array]) -> int:
+        """Frame rate is taken from the smallest interval between keyframes"""
+        intervals = np.concatenate([np.diff(value) for value in times])
+        intervals = intervals[intervals > 1e-6]
+        if len(intervals) == 0:
+            return DefaultFrameRate
+
+        return int(min(round(1.0 / intervals.min()), MaxFrameRate))
+
+    def add_accessor(self, data: np.array, component_type: int) -> int:
+        """Appends scalar accessor with data and returns its index"""
+        accessors: list[dict] = self.json.setdefault("accessors", [])
+        accessors.append({
+            "bufferView": self.add_buffer_view(data.tobytes()),
+            "componentType": component_type,
+            "count": len(data),
+            "type": "SCALAR"
+        })
+
+        return len(accessors) - 1
+
+    def remove_unused_data(self) -> None:
+        """Removes accessors and buffer views which are no longer referenced after packing"""
+        accessors: list[dict] = self.json.get("accessors", [])
+
+        if not all(name in PrunableExtensions or name.startswith("KHR_materials_") for name in self.json.get("extensionsUsed", [])):
+            return
+
+        # Instance transforms of nodes
+        instancing: list[dict] = [
+            node["extensions"]["EXT_mesh_gpu_instancing"].get("attributes", {})
+            for node in self.json.get("nodes", [])
+            if "EXT_mesh_gpu_instancing" in node.get("extensions", {})
+        ]
+
+        used_accessors: set[int] = set()
+        for mesh in self.json.get("meshes", []):
+            for primitive in mesh.get("primitives", []):
+                used_accessors.update(primitive.get("attributes", {}).values())
+                if primitive.get("indices") is not None:
+                    used_accessors.add(primitive["indices"])
+                for target in primitive.get("targets", []) or []:
+                    used_accessors.update(target.values())
+
+        for skin in self.json.get("skins", []):
+            if skin.get("inverseBindMatrices") is not None:
+                used_accessors.add(skin["inverseBindMatrices"])
+
+        for attributes in instancing:
+            used_accessors.update(attributes.values())
+
+        for animation in self.json.get("animations", []):
+            for sampler in animation.get("samplers", []):
+                used_accessors.update([sampler["input"], sampler["output"]])
+
+        packed: dict = self.json.get("extensions", {}).get(
+            "SC_odin_format", {}).get("animation", {}).get("packed", {})
+        for key in PackedAnimationAccessors:
+            if packed.get(key) is not None:
+                used_accessors.add(packed[key])
+
+        accessor_remap = {
+            old: new for new, old in enumerate(sorted(used_accessors))
+        }
+
+        for mesh in self.json.get("meshes", []):
+            for primitive in mesh.get("primitives", []):
+                attributes: dict = primitive.get("attributes", {})
+                for name, index in attributes.items():
+                    attributes[name] = accessor_remap[index]
+                if primitive.get("indices") is not None:
+                    primitive["indices"] = accessor_remap[primitive["indices"]]
+                for target in primitive.get("targets", []) or []:
+                    for name, index in target.items():
+                        target[name] = accessor_remap[index]
+
+        for skin in self.json.get("skins", []):
+            if skin.get("inverseBindMatrices") is not None:
+                skin["inverseBindMatrices"] = accessor_remap[skin["inverseBindMatrices"]]
+
+        for attributes in instancing:
+            for name, index in attributes.items():
+                attributes[name] = accessor_remap[index]
+
+        for animation in self.json.get("animations", []):
+            for sampler in animation.get("samplers", []):
+                sampler["input"] = accessor_remap[sampler["input"]]
+                sampler["output"] = accessor_remap[sampler["output"]]
+
+        for key in PackedAnimationAccessors:
+            if packed.get(key) is not None:
+                packed[key] = accessor_remap[packed[key]]
+
+        accessors = [accessors[i] for i in sorted(used_accessors)]
+        self.json["accessors"] = accessors
+
+        # Buffer views
+        odin: dict = self.json.get("extensions", {}).get("SC_odin_format", {})
+        used_views: set[int] = set()
+        for accessor in accessors:
+            if accessor.get("bufferView") is not None:
+                used_views.add(accessor["bufferView"])
+            sparse: dict = accessor.get("sparse")
+            if sparse is not None:
+                used_views.add(sparse["indices"]["bufferView"])
+                used_views.add(sparse["values"]["bufferView"])
+
+        for image in self.json.get("images", []):
+            if image.get("bufferView") is not None:
+                used_views.add(image["bufferView"])
+
+        if odin.get("bufferView") is not None:
+            used_views.add(odin["bufferView"])
+
+        view_remap = {old: new for new, old in enumerate(sorted(used_views))}
+
+        for accessor in accessors:
+            if accessor.get("bufferView") is not None:
+                accessor["bufferView"] = view_remap[accessor["bufferView"]]
+            sparse: dict = accessor.get("sparse")
+            if sparse is not None:
+                sparse["indices"]["bufferView"] = view_remap[sparse["indices"]["bufferView"]]
+                sparse["values"]["bufferView"] = view_remap[sparse["values"]["bufferView"]]
+
+        for image in self.json.get("images", []):
+            if image.get("bufferView") is not None:
+                image["bufferView"] = view_remap[image["bufferView"]]
+
+        if odin.get("bufferView") is not None:
+            odin["bufferView"] = view_remap[odin["bufferView"]]
+
+        self.buffers = [self.buffers[i] for i in sorted(used_views)]
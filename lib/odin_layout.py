@@ -0,0 +1,131 @@
+from lib.odin_constants import OdinAttributeFormat, OdinAttributeType
+from lib.odin_attribute import OdinAttribute
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+
+KnownAttributeTypes = {int(value) for value in OdinAttributeType}
+KnownAttributeFormats = {int(value) for value in OdinAttributeFormat}
+
+
+class OdinVertexLayout:
+    """
+    Decode plan of Odin vertex descriptor. Vertex buffer is read as array of structured dtype
+    and each attribute is a field of it
+    """
+
+    def __init__(self, stride: int, attributes: list[dict]) -> None:
+        self.stride = stride
+
+        # Messages about skipped attributes, they are printed by each file which uses layout
+        self.warnings: list[str] = []
+
+        # Attributes with accessor templates
+        self.attributes: list[tuple[OdinAttribute, dict]] = []
+
+        names: list[str] = []
+        formats: list = []
+        offsets: list[int] = []
+        itemsize = 0
+
+        for attribute in attributes:
+            attribute_type_index = attribute["index"]
+            attribute_format_index = attribute["format"]
+
+            if (attribute_type_index not in KnownAttributeTypes):
+                self.warnings.append(
+                    f"Unknown attribute name \"{attribute.get('name')}\". Skip...")
+                continue
+
+            if (attribute_format_index not in KnownAttributeFormats):
+                self.warnings.append(
+                    f"Unknown format \"{attribute_format_index}\" in attribute \"{attribute.get('name')}\". Skip...")
+                continue
+
+            attribute_format = OdinAttributeFormat(attribute_format_index)
+            odin_attribute = OdinAttribute(
+                OdinAttributeType(attribute_type_index),
+                attribute_format,
+                attribute["offset"]
+            )
+
+            accessor = {
+                "bufferView": None,
+                "componentType": OdinAttributeFormat.to_accessor_component(attribute_format),
+                "count": 0,
+                "type": OdinAttributeFormat.to_accessor_type(attribute_format)
+            }
+            isInteger = attribute.get("interpretAsInteger")
+            if isInteger is not None:
+                accessor["normalized"] = isInteger == False
+            else:
+                accessor["normalized"] = OdinAttributeFormat.is_normalized(
+                    attribute_format)
+
+            field_dtype, field_shape = odin_attribute.field_format
+            names.append(f"{len(self.attributes)}")
+            formats.append((field_dtype, field_shape))
+            offsets.append(odin_attribute.offset)
+            itemsize = max(itemsize, odin_attribute.offset +
+                           np.dtype((field_dtype, field_shape)).itemsize)
+
+            self.attributes.append((odin_attribute, accessor))
+
+        # Last vertex may be not padded to stride so size of structure is end of the last attribute
+        self.dtype = np.dtype({
+            "names": names,
+            "formats": formats,
+            "offsets": offsets,
+            "itemsize": itemsize
+        })
+
+    def decode(self, data: bytes, count: int, attribute_types: set | None = None) -> list[tuple[OdinAttribute, dict, np.array]]:
+        """Reads attributes of `count` vertices from data which starts with the first vertex"""
+        if (not self.attributes):
+            return []
+
+        vertices = np.ndarray(
+            (count, ), dtype=self.dtype, buffer=data, strides=(self.stride, ))
+
+        result: list[tuple[OdinAttribute, dict, np.array]] = []
+        for i, (attribute, accessor) in enumerate(self.attributes):
+            if (attribute_types is not None and int(attribute.type) not in attribute_types):
+                continue
+
+            result.append((
+                attribute,
+                dict(accessor, count=count),
+                attribute.unpack(vertices[f"{i}"])
+            ))
+
+        return result
+
+
+# Compiled layouts of recently processed files by layout signature. Only decode plans are shared, warnings are reported by files.
+# Files of the same game use few layouts, but batch of unrelated files can have many of them, so only recently used layouts are kept
+MaxVertexLayouts = 256
+VertexLayouts: OrderedDict[tuple, OdinVertexLayout] = OrderedDict()
+VertexLayoutsLock = Lock()
+
+
+def get_vertex_layout(descriptor: dict) -> OdinVertexLayout:
+    """Returns compiled layout of vertex descriptor. Descriptors which differ only by buffer offset share layout"""
+    signature = (descriptor["stride"], tuple(
+        (attribute["index"], attribute["format"], attribute["offset"],
+         attribute.get("interpretAsInteger"), attribute.get("name"))
+        for attribute in descriptor["attributes"]
+    ))
+
+    with VertexLayoutsLock:
+        layout = VertexLayouts.get(signature)
+        if layout is not None:
+            VertexLayouts.move_to_end(signature)
+            return layout
+
+        layout = OdinVertexLayout(
+            descriptor["stride"], descriptor["attributes"])
+        VertexLayouts[signature] = layout
+        if len(VertexLayouts) > MaxVertexLayouts:
+            VertexLayouts.popitem(last=False)
+
+    return layout
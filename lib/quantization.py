@@ -0,0 +1,55 @@
+import numpy as np
+
+# Helpers for KHR_mesh_quantization output
+# https://github.com/KhronosGroup/glTF/tree/main/extensions/2.0/Khronos/KHR_mesh_quantization
+
+
+def quantize_snorm(array: np.array, dtype) -> np.array:
+    """Converts float values in [-1, 1] range to normalized signed integers"""
+    limit = np.iinfo(dtype).max
+    return np.round(np.clip(array, -1.0, 1.0) * limit).astype(dtype)
+
+
+def quantize_unorm(array: np.array, dtype) -> np.array:
+    """Converts float values in [0, 1] range to normalized unsigned integers"""
+    limit = np.iinfo(dtype).max
+    return np.round(np.clip(array, 0.0, 1.0) * limit).astype(dtype)
+
+
+def quantize_weights(weights: np.array) -> np.array:
+    """Converts float skin weights to normalized bytes keeping their sum equal to 255"""
+    result = quantize_unorm(weights, np.uint8)
+
+    # Rounding error goes to the most influential joint
+    error = 255 - result.sum(axis=1, dtype=np.int32)
+    heaviest = np.argmax(weights, axis=1)
+    rows = np.arange(len(result))
+    result[rows, heaviest] = np.clip(
+        result[rows, heaviest].astype(np.int32) + error, 0, 255)
+
+    return result
+
+
+def quantize_tangents(tangents: np.array) -> np.array:
+    """Converts float tangents to normalized bytes. W component is kept as exact handedness sign"""
+    result = quantize_snorm(tangents, np.int8)
+    result[:, 3] = np.where(tangents[:, 3] < 0, -127, 127)
+    return result
+
+
+def position_dequantization(positions: list[np.array]) -> tuple[list[float], float]:
+    """Returns translation and uniform scale which map normalized short positions back to source bounds.
+    Uniform scale is used so normals do not need to be corrected"""
+    minimum = np.min([np.min(array, axis=0) for array in positions], axis=0)
+    maximum = np.max([np.max(array, axis=0) for array in positions], axis=0)
+
+    center = (minimum + maximum) / 2
+    scale = float(np.max(maximum - minimum)) / 2
+    if scale == 0:
+        scale = 1.0
+
+    return [float(value) for value in center], scale
+
+
+def quantize_positions(positions: np.array, translation: list[float], scale: float) -> np.array:
+    return quantize_snorm((positions - np.array(translation)) / scale, np.int16)
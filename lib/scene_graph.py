@@ -0,0 +1,133 @@
+import numpy as np
+
+
+class SceneGraph:
+    """
+    Node hierarchy stored in arrays.
+    Children of each node are stored in CSR form and nodes are ordered depth-first so that subtree of node is a range of that order
+    """
+
+    def __init__(self, parents: np.array, children: np.ndarray | None = None) -> None:
+        """
+        :param children: Nodes which have parent in order in which they are listed by their parents, ascending order by default
+        """
+        node_count = len(parents)
+
+        # Parent of each node, -1 for root nodes
+        self.parents = np.asarray(parents, dtype=np.int64)
+
+        # Children of node are child_indices[child_offsets[i]:child_offsets[i + 1]] in the same order as in children
+        has_parent = self.parents >= 0
+        if (children is None):
+            children = np.flatnonzero(has_parent)
+        children = np.asarray(children, dtype=np.int64)
+        self.child_indices = children[np.argsort(
+            self.parents[children], kind="stable")]
+        self.child_offsets = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.parents[has_parent], minlength=node_count),
+                  out=self.child_offsets[1:])
+
+        self.roots = np.flatnonzero(~has_parent)
+
+        # Depth-first preorder. Nodes which are not reachable from roots (cycles) are not included
+        self.order, self.depth = self.create_order()
+        self.position = np.full(node_count, -1, dtype=np.int64)
+        self.position[self.order] = np.arange(len(self.order))
+
+        # Nodes of each depth level are levels[level_offsets[i]:level_offsets[i + 1]]
+        order_depth = self.depth[self.order]
+        self.levels = self.order[np.argsort(order_depth, kind="stable")]
+        self.level_offsets = np.zeros(
+            int(order_depth.max(initial=-1)) + 2, dtype=np.int64)
+        np.cumsum(np.bincount(order_depth), out=self.level_offsets[1:])
+
+        # Subtree of node is order[position[i]:position[i] + subtree_size[i]]
+        self.subtree_size = np.ones(node_count, dtype=np.int64)
+        self.subtree_size[self.position < 0] = 0
+        for level in range(len(self.level_offsets) - 2, 0, -1):
+            level_nodes = self.get_level(level)
+            np.add.at(self.subtree_size,
+                      self.parents[level_nodes], self.subtree_size[level_nodes])
+
+    @staticmethod
+    def from_odin_nodes(nodes: list[dict]) -> "SceneGraph":
+        """
+        Creates graph from parent fields of SC_odin_format node extension, nodes without it keep their children.
+        Existing children lists keep their order, children from Odin hierarchy are added after them in index order
+        """
+        parents = np.full(len(nodes), -1, dtype=np.int64)
+
+        for i, node in enumerate(nodes):
+            for child in node.get("children", []):
+                parents[child] = i
+
+        for i, node in enumerate(nodes):
+            odin: dict = node.get("extensions", {}).get("SC_odin_format", {})
+            parent = odin.get("parent")
+            if (parent is not None and 0 <= parent < len(nodes)):
+                parents[i] = parent
+
+        listed = np.zeros(len(nodes), dtype=bool)
+        children: list[int] = []
+        for i, node in enumerate(nodes):
+            for child in node.get("children", []):
+                if (parents[child] == i and not listed[child]):
+                    listed[child] = True
+                    children.append(child)
+
+        children.extend(np.flatnonzero((parents >= 0) & ~listed).tolist())
+
+        return SceneGraph(parents, np.array(children, dtype=np.int64))
+
+    def create_order(self) -> tuple[np.array, np.array]:
+        """Returns depth-first preorder of nodes and depth of each node"""
+        child_offsets = self.child_offsets.tolist()
+        child_indices = self.child_indices.tolist()
+
+        order: list[int] = []
+        depth = [0] * len(self.parents)
+        stack = self.roots.tolist()[::-1]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+
+            children = child_indices[child_offsets[node]:child_offsets[node + 1]]
+            for child in children:
+                depth[child] = depth[node] + 1
+            stack.extend(children[::-1])
+
+        return np.array(order, dtype=np.int64), np.array(depth, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def get_children(self, node: int) -> np.array:
+        return self.child_indices[self.child_offsets[node]:self.child_offsets[node + 1]]
+
+    def get_level(self, level: int) -> np.array:
+        """Returns nodes with specific depth"""
+        return self.levels[self.level_offsets[level]:self.level_offsets[level + 1]]
+
+    def collect_subtrees(self, nodes: list[int]) -> np.array:
+        """
+        Returns all nodes of subtrees of given nodes. Each subtree is listed in postorder, children go before parent.
+        Nodes which are already listed by previous subtrees are skipped
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        nodes = nodes[self.position[nodes] >= 0]
+        if (len(nodes) == 0):
+            return nodes
+
+        # Index of first requested subtree which contains each node
+        request = np.full(len(self), len(nodes), dtype=np.int64)
+        np.minimum.at(request, nodes, np.arange(len(nodes)))
+        for level in range(1, len(self.level_offsets) - 1):
+            level_nodes = self.get_level(level)
+            request[level_nodes] = np.minimum(
+                request[level_nodes], request[self.parents[level_nodes]])
+
+        # Postorder position is preorder position moved by descendants which go before node and ancestors which go after it
+        postorder = self.position + self.subtree_size - 1 - self.depth
+
+        collected = self.order[request[self.order] < len(nodes)]
+        return collected[np.lexsort((postorder[collected], request[collected]))]
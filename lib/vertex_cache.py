@@ -0,0 +1,160 @@
+import numpy as np
+
+# Triangle and vertex reordering for post-transform vertex cache and overdraw
+# Based on "Fast Triangle Reordering for Vertex Locality and Reduced Overdraw" (Sander, Nehab, Barczak 2007)
+
+CacheSize = 16
+OverdrawThreshold = 1.05
+
+
+def average_cache_miss_ratio(indices: np.array, cache_size: int = CacheSize) -> float:
+    """Returns average number of FIFO cache misses per triangle"""
+    triangle_count = len(indices) // 3
+    if triangle_count == 0:
+        return 0.0
+
+    cache_time: dict[int, int] = {}
+    misses = 0
+    for index in indices.tolist():
+        time = cache_time.get(index)
+        if time is None or misses - time >= cache_size:
+            cache_time[index] = misses
+            misses += 1
+
+    return misses / triangle_count
+
+
+def optimize_vertex_cache(indices: np.array, vertex_count: int, cache_size: int = CacheSize) -> tuple[np.array, list[int]]:
+    """
+    Reorders triangles using Tipsify algorithm
+
+    :return: Reordered indices and list of triangle offsets where new cluster starts
+    """
+    triangles = indices.reshape(-1, 3)
+    triangle_count = len(triangles)
+
+    # Vertex to triangles adjacency in CSR form
+    corners = triangles.reshape(-1)
+    order = np.argsort(corners, kind="stable")
+    adjacency = (order // 3).tolist()
+    adjacency_offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(corners, minlength=vertex_count),
+              out=adjacency_offsets[1:])
+    adjacency_offsets = adjacency_offsets.tolist()
+
+    triangle_vertices = triangles.tolist()
+    live = np.bincount(corners, minlength=vertex_count).tolist()
+    cache_time = [0] * vertex_count
+    emitted = [False] * triangle_count
+    dead_end: list[int] = []
+
+    result: list[int] = []
+    clusters: list[int] = [0]
+    timestamp = cache_size + 1
+    cursor = 0
+
+    def skip_dead_end() -> int:
+        nonlocal cursor
+        while dead_end:
+            vertex = dead_end.pop()
+            if live[vertex] > 0:
+                return vertex
+
+        while cursor < vertex_count:
+            if live[cursor] > 0:
+                return cursor
+            cursor += 1
+
+        return -1
+
+    fanning = skip_dead_end()
+    while fanning >= 0:
+        candidates: list[int] = []
+
+        for i in range(adjacency_offsets[fanning], adjacency_offsets[fanning + 1]):
+            triangle = adjacency[i]
+            if emitted[triangle]:
+                continue
+
+            for vertex in triangle_vertices[triangle]:
+                result.append(vertex)
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
+
+                if timestamp - cache_time[vertex] > cache_size:
+                    cache_time[vertex] = timestamp
+                    timestamp += 1
+
+            emitted[triangle] = True
+
+        # Next fanning vertex is the one that will still be in cache after its triangles are emitted
+        fanning = -1
+        best_priority = -1
+        for vertex in candidates:
+            if live[vertex] <= 0:
+                continue
+
+            priority = 0
+            if timestamp - cache_time[vertex] + 2 * live[vertex] <= cache_size:
+                priority = timestamp - cache_time[vertex]
+
+            if priority > best_priority:
+                best_priority = priority
+                fanning = vertex
+
+        if fanning < 0:
+            fanning = skip_dead_end()
+            if fanning >= 0 and len(result) // 3 != clusters[-1]:
+                clusters.append(len(result) // 3)
+
+    return np.array(result, dtype=indices.dtype), clusters
+
+
+def optimize_overdraw(indices: np.array, clusters: list[int], positions: np.array) -> np.array:
+    """Sorts triangle clusters so that ones facing away from mesh center are drawn first"""
+    triangles = indices.reshape(-1, 3)
+    if len(clusters) < 2:
+        return indices
+
+    corners = positions[triangles].astype(np.float64)
+    normals = np.cross(corners[:, 1] - corners[:, 0],
+                       corners[:, 2] - corners[:, 0])
+    centroids = corners.mean(axis=1)
+
+    # Area weighted values of each cluster
+    areas = np.linalg.norm(normals, axis=1)
+    cluster_normals = np.add.reduceat(normals, clusters)
+    cluster_centroids = np.add.reduceat(
+        centroids * areas[:, None], clusters)
+    cluster_areas = np.add.reduceat(areas, clusters)
+
+    mesh_centroid = cluster_centroids.sum(axis=0) / max(areas.sum(), 1e-12)
+    cluster_centroids /= np.maximum(cluster_areas, 1e-12)[:, None]
+    cluster_normals /= np.maximum(np.linalg.norm(
+        cluster_normals, axis=1), 1e-12)[:, None]
+
+    occlusion = np.einsum("ij,ij->i", cluster_centroids -
+                          mesh_centroid, cluster_normals)
+    cluster_order = np.argsort(-occlusion, kind="stable")
+
+    bounds = np.append(clusters, len(triangles))
+    triangle_order = np.concatenate([
+        np.arange(bounds[i], bounds[i + 1]) for i in cluster_order
+    ])
+
+    return triangles[triangle_order].reshape(-1)
+
+
+def optimize_vertex_fetch(index_buffers: list[np.array], vertex_count: int) -> np.array:
+    """
+    Returns new vertex order in which vertices are sorted by first use in index buffers.
+    Unused vertices are moved to the end
+    """
+    indices = np.concatenate(index_buffers) if index_buffers else np.zeros(
+        0, dtype=np.uint32)
+    used, first_use = np.unique(indices, return_index=True)
+    used = used[np.argsort(first_use, kind="stable")]
+
+    unused = np.setdiff1d(np.arange(vertex_count), used, assume_unique=True)
+    return np.concatenate([used, unused]).astype(np.int64)
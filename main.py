@@ -1,8 +1,11 @@
 import os
 import json
+import math
 import argparse
+import mmap
 from lib.glTF import glTF, ObjectProcessor
 from lib.odin import SupercellOdinGLTF
+from lib.odin_encoder import SupercellOdinEncoder
 
 debug = False
 
@@ -18,7 +21,16 @@ if (debug):
     required_folders["out_debug"] = "Out-Debug"
 
 
-def decode(post_process: bool):
+def positive_float(value: str) -> float:
+    """Argument type of rates which are used as dividers"""
+    number = float(value)
+    if not (number > 0 and math.isfinite(number)):
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+
+    return number
+
+
+def decode(post_process: bool, workers: int | None = None, quantize: bool = False, meshopt: bool = False, optimize: bool = False, stream: bool = False, animation_tolerance: tuple[float, float, float] | None = None, animation_fps: float | None = None):
     files = os.scandir(required_folders["sc_input"])
 
     for filepath in files:
@@ -27,7 +39,12 @@ def decode(post_process: bool):
 
         try:
             with open(filepath.path, "rb") as file:
-                gltf.read(file.read())
+                # Binary chunk is read directly from memory mapped file in stream mode
+                if (stream):
+                    gltf.read(mmap.mmap(file.fileno(), 0,
+                              access=mmap.ACCESS_READ), copy=False)
+                else:
+                    gltf.read(file.read())
         except ValueError as e:
             print(f"Error: {e}")
             print(f"Failed to read file by name \"{filepath.name}\". Skip...")
@@ -36,32 +53,42 @@ def decode(post_process: bool):
         for chunk in gltf.chunks:
             chunk.deserialize_json()
 
-        if (post_process):
-            odin = SupercellOdinGLTF(gltf)
-            gltf = odin.process()
+        odin = SupercellOdinGLTF(
+            gltf, workers=workers, quantize=quantize, meshopt=meshopt, optimize=optimize, stream=stream, animation_tolerance=animation_tolerance, animation_fps=animation_fps) if post_process else None
 
-        if debug:
-            for chunk in gltf.chunks:
-                if chunk.name != "JSON":
-                    continue
-
-                file = open(os.path.join(
-                    required_folders["out_debug"], filepath.name) + ".json", "wb")
-                if (isinstance(chunk.data, bytes)):
-                    file.write(chunk.data)
-                else:
-                    file.write(
-                        bytes(json.dumps(chunk.data, cls=ObjectProcessor, indent=4), "utf8"))
+        # Temporary storage of stream mode is removed only after output is written
+        try:
+            if (odin is not None):
+                gltf = odin.process()
 
-                break
+            if debug:
+                for chunk in gltf.chunks:
+                    if chunk.name != "JSON":
+                        continue
 
-        print(f"\rSuccessful: \"{filepath.name}\"")
+                    file = open(os.path.join(
+                        required_folders["out_debug"], filepath.name) + ".json", "wb")
+                    if (isinstance(chunk.data, bytes)):
+                        file.write(chunk.data)
+                    else:
+                        file.write(
+                            bytes(json.dumps(chunk.data, cls=ObjectProcessor, indent=4), "utf8"))
 
-        with open(os.path.join(required_folders["def_output"], filepath.name), "wb") as file:
-            file.write(gltf.write())
+                    break
+
+            print(f"\rSuccessful: \"{filepath.name}\"")
+            if (odin is not None):
+                for line in odin.statistics:
+                    print(f"    {line}")
 
+            with open(os.path.join(required_folders["def_output"], filepath.name), "wb") as file:
+                gltf.write_to(file)
+        finally:
+            if (odin is not None):
+                odin.close()
 
-def encode():
+
+def encode(pack: bool = False):
     files = os.scandir(required_folders["def_input"])
 
     for filepath in files:
@@ -71,6 +98,10 @@ def encode():
         with open(filepath.path, "rb") as file:
             gltf.read(file.read())
 
+        if (pack):
+            encoder = SupercellOdinEncoder(gltf)
+            gltf = encoder.process()
+
         for chunk in gltf.chunks:
             chunk.serialize_json()
 
@@ -100,11 +131,28 @@ if __name__ == "__main__":
 
     parser.add_argument("mode", type=str, choices=[
                         "decode", "decodeRaw", "encode"])
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of threads used for decoding of mesh data")
+    parser.add_argument("--quantize", action="store_true",
+                        help="Store mesh attributes in compact integer formats using KHR_mesh_quantization")
+    parser.add_argument("--meshopt", action="store_true",
+                        help="Compress vertex, index and animation data using EXT_meshopt_compression")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Reorder triangles and vertices for better vertex cache usage and less overdraw")
+    parser.add_argument("--stream", action="store_true",
+                        help="Keep produced buffers in temporary file instead of memory when decoding big files")
+    parser.add_argument("--anim-tolerance", type=float, nargs=3, default=None, metavar=("POSITION", "ROTATION", "SCALE"),
+                        help="Remove animation keyframes which can be restored by interpolation within max position error in units, rotation error in degrees and scale error ratio")
+    parser.add_argument("--anim-fps", type=positive_float, default=None,
+                        help="Resample animations to specified frame rate")
+    parser.add_argument("--pack", action="store_true",
+                        help="Pack mesh attributes into interleaved Odin vertex buffer and animation into packed Odin animation when encoding")
 
     args = parser.parse_args()
     if (args.mode == "decode"):
-        decode(post_process=True)
+        decode(post_process=True, workers=args.workers,
+               quantize=args.quantize, meshopt=args.meshopt, optimize=args.optimize, stream=args.stream, animation_tolerance=args.anim_tolerance, animation_fps=args.anim_fps)
     if (args.mode == "decodeRaw"):
         decode(post_process=False)
     elif (args.mode == "encode"):
-        encode()
+        encode(pack=args.pack)
@@ -0,0 +1,126 @@
+import numpy as np
+from lib.animation.flags import OdinAnimationFlags
+
+RotationChannels = 4
+TranslationChannels = 3
+ScaleChannels = 3
+
+
+def scalar_denormalize_transforms(frame_count: int, flags: OdinAnimationFlags, multiplier: tuple,
+                                  bTranslation: list, bRotation: list, bScale: list,
+                                  nTranslation: np.array, nRotation: np.array, nScale: np.array) -> np.array:
+    """
+    Frame by frame implementation of OdinPackedReader.denormalize_transforms which was used before it was vectorized.
+    Base values and multipliers are (1, ) float32 arrays as they were read from node accessor,
+    so translation and scale are calculated in single precision
+
+    :return: (frames, 10) block with Translation, Rotation and Scale of each frame
+    """
+    translation_multiplier, scale_multiplier = multiplier
+
+    rotation = [np.zeros((frame_count), dtype=np.float32) for _ in range(RotationChannels)]
+    translation = [np.zeros((frame_count), dtype=np.float32) for _ in range(TranslationChannels)]
+    scale = [np.full((frame_count), 1, dtype=np.float32) for _ in range(ScaleChannels)]
+
+    for frame_index in range(frame_count):
+        for i in range(TranslationChannels):
+            value = float(bTranslation[i])
+            if flags.has_translation:
+                transform = float(nTranslation[i][frame_index]) * translation_multiplier
+                value += transform
+
+            translation[i][frame_index] = value
+
+        for i in range(RotationChannels):
+            value = float(bRotation[i])
+            if flags.has_rotation:
+                value = float(nRotation[i][frame_index]) / 32767.0
+
+            rotation[i][frame_index] = value
+
+        for i in range(ScaleChannels):
+            value = float(bScale[i])
+            if flags.has_scale or flags.has_separate_scale:
+                transform = float(nScale[i][frame_index]) * scale_multiplier
+                value += transform
+
+            scale[i][frame_index] = value
+
+    return np.stack(translation + rotation + scale, axis=1)
+
+
+def scalar_read_continuous_transforms(data: np.array, offset: int, frame_count: int, flags: OdinAnimationFlags) -> tuple:
+    """
+    Frame by frame walk over run-length stream of OdinContinuousPackedReader which was used before runs were expanded with array operations.
+    Frame numbers are collected the same way: keyframes keep stored value and repeated frames follow held keyframe one by one
+
+    :return: Translation, rotation and scale as lists of per channel int16 arrays, frame numbers, indices of key frames and offset of next node.
+        Nodes without transform have no stream and no key frames
+    """
+    rotation = [np.zeros((frame_count), dtype=np.int16) for _ in range(RotationChannels)] if flags.has_rotation else None
+    translation = [np.zeros((frame_count), dtype=np.int16) for _ in range(TranslationChannels)] if flags.has_translation else None
+    scale = [np.zeros((frame_count), dtype=np.int16) for _ in range(ScaleChannels)] if (flags.has_scale or flags.has_separate_scale) else None
+    frame_numbers = np.zeros((frame_count), dtype=np.int64)
+    key_frames = []
+
+    if (not flags.has_transform):
+        return translation, rotation, scale, frame_numbers, None, offset
+
+    def read_normalized_value() -> int:
+        nonlocal offset
+        offset += 1
+        return data[offset - 1]
+
+    frame_index = 0
+    while (frame_count > frame_index):
+        if (frame_index != 0):
+            repeat_keyframe_count = abs(int(read_normalized_value()))
+
+            for _ in range(repeat_keyframe_count):
+                if (flags.has_rotation):
+                    for i in range(RotationChannels):
+                        rotation[i][frame_index] = rotation[i][frame_index - 1]
+
+                if (flags.has_translation):
+                    for i in range(TranslationChannels):
+                        translation[i][frame_index] = translation[i][frame_index - 1]
+
+                if (flags.has_scale or flags.has_separate_scale):
+                    for i in range(ScaleChannels):
+                        scale[i][frame_index] = scale[i][frame_index - 1]
+
+                frame_numbers[frame_index] = frame_numbers[frame_index - 1] + 1
+                frame_index += 1
+
+            # Last repeated frame holds value until the next keyframe
+            if (repeat_keyframe_count):
+                key_frames.append(frame_index - 1)
+
+        if (frame_index >= frame_count):
+            break
+
+        keyframes_count = int(read_normalized_value())
+        for _ in range(keyframes_count):
+            if (flags.has_frametime):
+                frame_numbers[frame_index] = read_normalized_value()
+
+            if (flags.has_rotation):
+                for i in range(RotationChannels):
+                    rotation[i][frame_index] = read_normalized_value()
+
+            if (flags.has_translation):
+                for i in range(TranslationChannels):
+                    translation[i][frame_index] = read_normalized_value()
+
+            if (flags.has_scale and flags.has_separate_scale):
+                for i in range(ScaleChannels):
+                    scale[i][frame_index] = read_normalized_value()
+            elif (flags.has_scale):
+                value = read_normalized_value()
+                for i in range(ScaleChannels):
+                    scale[i][frame_index] = value
+
+            key_frames.append(frame_index)
+            frame_index += 1
+
+    return translation, rotation, scale, frame_numbers, np.array(key_frames, dtype=np.int64), offset
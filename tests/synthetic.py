@@ -0,0 +1,275 @@
+import json
+import struct
+import numpy as np
+from lib.glTF import glTF
+from lib.flatbuffer import serialize_glb_json
+from lib.odin import SupercellOdinGLTF
+from lib.animation.flags import OdinAnimationFlags
+
+AccessorDtypes = {5120: np.int8, 5121: np.uint8, 5122: np.int16,
+                  5123: np.uint16, 5125: np.uint32, 5126: np.float32}
+AccessorElements = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+
+
+def create_odin_file(vertex_count: int = 64, frame_count: int = 0, seed: int = 0) -> bytes:
+    """
+    Creates Supercell glTF file with single Odin mesh of positions, normals and texture coordinates.
+    Nodes 1 and 2 get raw animation with smooth curves if frame count is specified
+    """
+    rng = np.random.default_rng(seed)
+    views: list[bytes] = []
+    accessors: list[dict] = []
+
+    def add_accessor(data: np.array, component_type: int, accessor_type: str) -> int:
+        views.append(data.tobytes())
+        accessors.append({"bufferView": len(views) - 1, "componentType": component_type,
+                          "count": data.size // AccessorElements[accessor_type], "type": accessor_type})
+        return len(accessors) - 1
+
+    vertices = np.zeros(vertex_count, dtype=np.dtype({
+        "names": ["position", "normal", "uv"],
+        "formats": [(np.float32, 3), (np.int8, 3), (np.float32, 2)],
+        "offsets": [0, 12, 16],
+        "itemsize": 24
+    }))
+    vertices["position"] = rng.normal(size=(vertex_count, 3))
+    vertices["normal"] = rng.integers(-128, 128, size=(vertex_count, 3))
+    vertices["uv"] = rng.random((vertex_count, 2))
+    vertex_view = len(views)
+    views.append(vertices.tobytes())
+
+    primitives = []
+    for _ in range(2):
+        indices = rng.integers(0, vertex_count, size=3 * vertex_count).astype(np.uint16)
+        indices[0] = vertex_count - 1
+        primitives.append({
+            "indices": add_accessor(indices, 5123, "SCALAR"),
+            "extensions": {"SC_odin_format": {"meshDataInfoIndex": 0}}
+        })
+
+    odin = {
+        "bufferView": vertex_view,
+        "meshDataInfos": [{"vertexDescriptors": [{"offset": 0, "stride": 24, "attributes": [
+            {"index": 0, "format": 30, "offset": 0, "name": "a_pos"},
+            {"index": 1, "format": 12, "offset": 12, "name": "a_normal"},
+            {"index": 2, "format": 29, "offset": 16, "name": "a_uv0"},
+        ]}]}]
+    }
+
+    if frame_count:
+        time = np.linspace(0.0, 1.0, frame_count)[None, :, None]
+        phase = rng.random((2, 1, 1)) * np.pi
+        translation = np.sin(time * np.array([1.0, 2.0, 3.0]) + phase)
+        angle = (time + phase) * np.pi
+        rotation = np.concatenate([np.sin(angle), np.zeros_like(angle), np.zeros_like(angle), np.cos(angle)], axis=2)
+        scale = 1.0 + 0.5 * np.cos(time * np.array([1.0, 1.0, 2.0]) + phase)
+        transforms = np.concatenate([translation, rotation, scale], axis=2).astype(np.float32)
+
+        odin["animation"] = {"frameRate": 30, "keyframesCount": frame_count, "nodes": [1, 2],
+                             "accessor": add_accessor(transforms, 5126, "SCALAR")}
+
+    binary = bytearray()
+    buffer_views = []
+    for view in views:
+        buffer_views.append({"buffer": 0, "byteOffset": len(binary), "byteLength": len(view)})
+        binary += view + bytes(-len(view) % 4)
+
+    nodes = [
+        {"name": "root", "mesh": 0},
+        {"name": "bone", "extensions": {"SC_odin_format": {"parent": 0}}},
+        {"name": "tip", "extensions": {"SC_odin_format": {"parent": 1}}},
+    ]
+    data = {
+        "asset": {"version": "2.0"}, "accessors": accessors, "bufferViews": buffer_views,
+        "buffers": [{"byteLength": len(binary)}], "meshes": [{"primitives": primitives}], "nodes": nodes,
+        "extensionsUsed": ["SC_odin_format"], "extensionsRequired": ["SC_odin_format"],
+        "extensions": {"SC_odin_format": odin}
+    }
+
+    flat = serialize_glb_json(data)
+    flat += bytes(-len(flat) % 4)
+    chunks = struct.pack("<I4s", len(flat), b"FLA2") + flat + \
+        struct.pack("<I4s", len(binary), b"BIN\0") + bytes(binary)
+    return b"glTF" + struct.pack("<II", 2, 12 + len(chunks)) + chunks
+
+
+def read_file(data: bytes) -> glTF:
+    """Reads file with json chunk as dict, both Supercell and regular glTF are supported"""
+    file = glTF()
+    file.read(data)
+    for chunk in file.chunks:
+        chunk.deserialize_json()
+        if chunk.name == "JSON" and not isinstance(chunk.data, dict):
+            chunk.data = json.loads(bytes(chunk.data))
+
+    return file
+
+
+def decode_odin_file(data: bytes, **options) -> tuple[dict, bytes]:
+    """Converts Supercell file to regular glTF and returns its json and binary chunk"""
+    odin = SupercellOdinGLTF(read_file(data), **options)
+    try:
+        result = read_file(odin.process().write())
+    finally:
+        odin.close()
+
+    return result.get_chunk("JSON").data, result.get_chunk("BIN").data
+
+
+def read_accessor(gltf: dict, binary: bytes, index: int) -> np.array:
+    """Reads accessor values as (count, elements) array without normalization"""
+    accessor = gltf["accessors"][index]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    dtype = np.dtype(AccessorDtypes[accessor["componentType"]])
+    elements = AccessorElements[accessor["type"]]
+
+    return np.ndarray(
+        (accessor["count"], elements), dtype=dtype, buffer=binary,
+        offset=view.get("byteOffset", 0) + accessor.get("byteOffset", 0),
+        strides=(view.get("byteStride", dtype.itemsize * elements), dtype.itemsize)
+    ).copy()
+
+
+def read_triangles(gltf: dict, binary: bytes) -> list[dict[str, np.array]]:
+    """Returns attribute values of every index of every primitive"""
+    result = []
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh["primitives"]:
+            indices = read_accessor(gltf, binary, primitive["indices"]).reshape(-1)
+            result.append({
+                name: read_accessor(gltf, binary, index)[indices]
+                for name, index in primitive["attributes"].items()
+            })
+
+    return result
+
+
+class AccessorSource:
+    """Provides decoded accessors to animation readers the same way as SupercellOdinGLTF does"""
+
+    def __init__(self, accessors: list[np.array]):
+        self.accessors = accessors
+        self.workers = None
+
+    def decode_accessor(self, index: int) -> np.array:
+        return self.accessors[index]
+
+
+def create_mixed_packed_clip(padding: int = 0, seed: int = 0) -> tuple[AccessorSource, dict, list[dict[str, np.array]]]:
+    """
+    Creates packed animation where nodes with frametime are stored after frames of fixed stride nodes.
+    Data is followed by padding values which do not belong to any node
+
+    :return: Accessors, animation descriptor and expected translation, rotation, scale and key times of each node
+    """
+    rng = np.random.default_rng(seed)
+    frame_rate = 24
+    fixed_frame_count = 9
+
+    # Flags and frame counts of nodes, frametime nodes are mixed with fixed ones
+    nodes = [(2 | 4, fixed_frame_count), (1 | 2 | 4 | 8, 5), (8 | 16, fixed_frame_count), (1 | 4, 3), (0, fixed_frame_count)]
+
+    base = rng.normal(size=(len(nodes), 12)).astype(np.float32)
+    base[:, 10:] = np.abs(base[:, 10:]) * 0.01
+
+    fixed_columns = []
+    sequential_blocks = []
+    expected = []
+    for i, (flags, frame_count) in enumerate(nodes):
+        translation = rng.integers(-32767, 32768, size=(frame_count, 3)).astype(np.int16)
+        rotation = rng.integers(-32767, 32768, size=(frame_count, 4)).astype(np.int16)
+        scale = rng.integers(-32767, 32768, size=(frame_count, 3)).astype(np.int16)
+        frames = np.sort(rng.choice(np.arange(1, 100), size=frame_count, replace=False)).astype(np.int16)
+
+        # Elements of frame in the same order as flags bits
+        columns = [column for bit, column in [
+            (1, frames[:, None]), (2, rotation), (4, translation), (8, scale[:, :3 if flags & 16 else 1])
+        ] if flags & bit]
+        block = np.concatenate(columns, axis=1) if columns else np.zeros((frame_count, 0), dtype=np.int16)
+        if flags & 1:
+            sequential_blocks.append(block.reshape(-1))
+        else:
+            fixed_columns.append(block)
+
+        if not flags & 16:
+            scale = np.repeat(scale[:, :1], 3, axis=1)
+
+        node_base = base[i]
+        expected.append({
+            "translation": node_base[0:3] + translation.astype(np.float32) * node_base[10] if flags & 4 else np.repeat([node_base[0:3]], frame_count, axis=0),
+            "rotation": rotation / 32767.0 if flags & 2 else np.repeat([node_base[3:7]], frame_count, axis=0),
+            "scale": node_base[7:10] + scale.astype(np.float32) * node_base[11] if flags & (8 | 16) else np.repeat([node_base[7:10]], frame_count, axis=0),
+            "times": (frames / frame_rate).astype(np.float32) if flags & 1 else None,
+        })
+
+    data = np.concatenate([np.concatenate(fixed_columns, axis=1).reshape(-1), *sequential_blocks,
+                           np.zeros(padding, dtype=np.int16)])
+    descriptor = {"frameRate": frame_rate, "keyframesCount": fixed_frame_count, "packed": {
+        "nodes": [
+            {"nodeIndex": i + 1, "flags": flags, "frameCount": frame_count,
+             "dataSize": frame_count * OdinAnimationFlags(flags).elements_count}
+            for i, (flags, frame_count) in enumerate(nodes)
+        ],
+        "dataAccessor": 0,
+        "nodeAccessor": 1
+    }}
+
+    return AccessorSource([data, base.reshape(-1)]), descriptor, expected
+
+
+def create_run_stream(rng: np.random.Generator, frame_count: int, flags: OdinAnimationFlags) -> np.array:
+    """
+    Creates run-length stream of continuous packed node with repeat runs of different length.
+    Some repeat counters are negative as in game files. Frame numbers of frametime nodes increase with gaps
+    """
+    layout = flags.layout
+    stream = []
+    frame_number = 0
+    frame_index = 0
+    while frame_index < frame_count:
+        if frame_index:
+            repeat = int(min(rng.integers(0, 6), frame_count - frame_index))
+            stream.append(-repeat if rng.random() < 0.25 else repeat)
+            frame_index += repeat
+            frame_number += repeat
+            if frame_index >= frame_count:
+                break
+
+        count = int(min(rng.integers(0 if frame_index else 1, 5), frame_count - frame_index))
+        stream.append(count)
+        for _ in range(count):
+            frame_number += int(rng.integers(1, 3))
+            values = rng.integers(-32767, 32768, size=layout.elements_count)
+            if layout.frametime_offset is not None:
+                values[layout.frametime_offset] = frame_number
+            stream.extend(values.tolist())
+        frame_index += count
+
+    return np.array(stream, dtype=np.int16)
+
+
+def create_continuous_packed_clip(seed: int = 0) -> tuple[AccessorSource, dict]:
+    """Creates continuous packed animation with nodes of different flags, frametime nodes included"""
+    rng = np.random.default_rng(seed)
+    nodes = [(2 | 4 | 8, 40), (1 | 2 | 4, 33), (1 | 8 | 16, 25), (4, 40), (0, 40), (2 | 8 | 16, 1), (1 | 2 | 4 | 8 | 16, 50), (16, 12)]
+
+    streams = [
+        create_run_stream(rng, frame_count, OdinAnimationFlags(flags)) if flags else np.zeros(0, dtype=np.int16)
+        for flags, frame_count in nodes
+    ]
+
+    base = rng.normal(size=(len(nodes), 8)).astype(np.float32)
+    base[:, 6:] = np.abs(base[:, 6:]) * 0.01
+    rotation = rng.integers(0, 3, size=(len(nodes), 4)).astype(np.uint32)
+
+    descriptor = {"frameRate": 30, "keyframesCount": 40, "packed": {
+        "nodes": [
+            {"nodeIndex": i, "flags": flags, "frameCount": frame_count, "dataSize": len(stream)}
+            for i, ((flags, frame_count), stream) in enumerate(zip(nodes, streams))
+        ],
+        "dataAccessor": 0,
+        "nodeAccessor": 1,
+        "uintAccessor": 2
+    }}
+
+    return AccessorSource([np.concatenate(streams), base.reshape(-1), rotation.reshape(-1)]), descriptor
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from lib.animation import OdinAnimation
+from lib.animation.continuousPackedReader import OdinContinuousPackedReader
+from tests.reference import scalar_denormalize_transforms, scalar_read_continuous_transforms
+from tests.synthetic import create_continuous_packed_clip
+
+
+# Scalar loop converts (1, ) arrays to floats the same way as it did before
+@pytest.mark.filterwarnings("ignore:Conversion of an array with ndim > 0 to a scalar:DeprecationWarning")
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("seed", range(8))
+def test_continuous_runs_match_scalar_walk(seed: int, lazy: bool):
+    source, descriptor = create_continuous_packed_clip(seed)
+    reader = OdinAnimation.Create(source, descriptor, lazy=lazy)
+    assert isinstance(reader, OdinContinuousPackedReader)
+
+    data, base, rotation = source.accessors
+    base = base.reshape(-1, 8)
+    rotation = rotation.reshape(-1, 4)
+
+    offset = 0
+    for node_index, (node, flags) in enumerate(zip(descriptor["packed"]["nodes"], reader.flags)):
+        frame_count = node["frameCount"]
+        translation, rotation_values, scale, frame_numbers, key_frames, next_offset = scalar_read_continuous_transforms(
+            data, offset, frame_count, flags)
+        assert next_offset - offset == node["dataSize"]
+        offset = next_offset
+
+        node_base = base[node_index]
+        expected = scalar_denormalize_transforms(
+            frame_count, flags, (node_base[6:7], node_base[7:8]),
+            node_base[0:3], rotation[node_index].astype(np.float32), node_base[3:6],
+            translation, rotation_values, scale)
+
+        result = np.concatenate(reader.get_node_data(node_index), axis=1)
+        np.testing.assert_array_equal(result.view(np.uint32), expected.view(np.uint32), err_msg=str(node_index))
+
+        times = reader.get_node_frame_times(node_index)
+        if flags.has_frametime:
+            np.testing.assert_array_equal(times, (frame_numbers / 30).astype(np.float32), err_msg=str(node_index))
+        else:
+            assert times is None
+
+        if flags.has_transform:
+            np.testing.assert_array_equal(reader.get_node_key_frames(node_index), key_frames, err_msg=str(node_index))
+
+    # Synthetic streams have repeat runs longer than single frame
+    assert any(abs(value) > 1 for value in data.tolist())
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from lib.glTF import glTF, glTF_Chunk
+from lib.odin import NodeRestTransform
+from lib.odin_encoder import SupercellOdinEncoder
+from tests.synthetic import create_odin_file, decode_odin_file, read_accessor, read_file, read_triangles
+
+
+def encode_file(gltf: dict, binary: bytes) -> bytes:
+    """Converts regular glTF back to Supercell file"""
+    file = glTF()
+    file.chunks = [glTF_Chunk("JSON", gltf), glTF_Chunk("BIN\0", binary)]
+
+    result = SupercellOdinEncoder(read_file(file.write())).process()
+    for chunk in result.chunks:
+        chunk.serialize_json()
+
+    return result.write()
+
+
+def sample_channel(gltf: dict, binary: bytes, node: int, path: str, times: np.array) -> np.array:
+    """Samples animation channel with linear interpolation, node transform is returned if channel is not written"""
+    for animation in gltf.get("animations", []):
+        for channel in animation["channels"]:
+            if channel["target"] != {"node": node, "path": path}:
+                continue
+
+            sampler = animation["samplers"][channel["sampler"]]
+            key_times = read_accessor(gltf, binary, sampler["input"]).reshape(-1)
+            values = read_accessor(gltf, binary, sampler["output"])
+            result = np.stack([np.interp(times, key_times, component) for component in values.T], axis=1)
+            if path == "rotation":
+                result /= np.linalg.norm(result, axis=1, keepdims=True)
+
+            return result
+
+    rest = gltf["nodes"][node].get(path, NodeRestTransform[path])
+    return np.repeat([rest], len(times), axis=0)
+
+
+def assert_same_animation(gltf: dict, binary: bytes, result_gltf: dict, result_binary: bytes) -> None:
+    """Compares animation of synthetic nodes at times between keyframes"""
+    times = np.linspace(0.0, 1.0, 61)
+    for node in (1, 2):
+        for path in NodeRestTransform:
+            expected = sample_channel(gltf, binary, node, path, times)
+            result = sample_channel(result_gltf, result_binary, node, path, times)
+            if path == "rotation":
+                result *= np.sign((expected * result).sum(axis=1, keepdims=True))
+
+            np.testing.assert_allclose(result, expected, atol=1e-3, err_msg=f"{node} {path}")
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_round_trip_keeps_mesh_data(quantize: bool):
+    gltf, binary = decode_odin_file(create_odin_file(), quantize=quantize)
+    result_gltf, result_binary = decode_odin_file(encode_file(gltf, binary), quantize=quantize)
+
+    triangles = read_triangles(gltf, binary)
+    result_triangles = read_triangles(result_gltf, result_binary)
+    assert len(triangles) == len(result_triangles) == 2
+
+    for primitive, result_primitive in zip(triangles, result_triangles):
+        assert primitive.keys() == result_primitive.keys()
+        for name in primitive:
+            np.testing.assert_array_equal(primitive[name], result_primitive[name], err_msg=name)
+
+
+def test_round_trip_keeps_instancing_accessors():
+    gltf, binary = decode_odin_file(create_odin_file())
+
+    translation = np.arange(12, dtype=np.float32).reshape(4, 3)
+    gltf["bufferViews"].append({"buffer": 0, "byteOffset": len(binary), "byteLength": translation.nbytes})
+    gltf["buffers"][0]["byteLength"] = len(binary) + translation.nbytes
+    gltf["accessors"].append({"bufferView": len(gltf["bufferViews"]) - 1,
+                             "componentType": 5126, "count": 4, "type": "VEC3"})
+    gltf["nodes"][0]["extensions"] = {"EXT_mesh_gpu_instancing": {
+        "attributes": {"TRANSLATION": len(gltf["accessors"]) - 1}}}
+    gltf.setdefault("extensionsUsed", []).append("EXT_mesh_gpu_instancing")
+
+    encoded = read_file(encode_file(gltf, binary + translation.tobytes()))
+    encoded_gltf = encoded.get_chunk("JSON").data
+
+    instancing = encoded_gltf["nodes"][0]["extensions"]["EXT_mesh_gpu_instancing"]
+    np.testing.assert_array_equal(read_accessor(
+        encoded_gltf, encoded.get_chunk("BIN").data, instancing["attributes"]["TRANSLATION"]), translation)
+
+
+def test_round_trip_keeps_animation():
+    gltf, binary = decode_odin_file(create_odin_file(frame_count=31))
+    result_gltf, result_binary = decode_odin_file(encode_file(gltf, binary))
+
+    assert "animations" in result_gltf
+    assert_same_animation(gltf, binary, result_gltf, result_binary)
+
+
+def test_round_trip_packs_animation_without_meshes():
+    gltf, binary = decode_odin_file(create_odin_file(frame_count=31))
+    gltf.pop("meshes")
+    gltf["nodes"][0].pop("mesh")
+
+    encoded = encode_file(gltf, binary)
+    encoded_gltf = read_file(encoded).get_chunk("JSON").data
+    assert "animations" not in encoded_gltf
+    assert "packed" in encoded_gltf["extensions"]["SC_odin_format"]["animation"]
+
+    result_gltf, result_binary = decode_odin_file(encoded)
+    assert_same_animation(gltf, binary, result_gltf, result_binary)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from tests.synthetic import create_odin_file, decode_odin_file, read_accessor
+
+
+def read_channels(gltf: dict, binary: bytes) -> dict[tuple[int, str], tuple[np.array, np.array]]:
+    """Returns key times and values of decoded animation channels by node and path"""
+    animation = gltf["animations"][0]
+    channels = {}
+    for channel in animation["channels"]:
+        sampler = animation["samplers"][channel["sampler"]]
+        channels[(channel["target"]["node"], channel["target"]["path"])] = (
+            read_accessor(gltf, binary, sampler["input"]).reshape(-1),
+            read_accessor(gltf, binary, sampler["output"]))
+
+    return channels
+
+
+def test_resampled_animation_keeps_end_key():
+    source = create_odin_file(frame_count=31)
+    channels = read_channels(*decode_odin_file(source))
+    resampled = read_channels(*decode_odin_file(source, animation_fps=12))
+
+    assert channels.keys() == resampled.keys()
+    for key, (times, values) in channels.items():
+        result_times, result_values = resampled[key]
+
+        # One second clip at 12 frames per second
+        assert len(result_times) == len(result_values) == 13
+        np.testing.assert_allclose(np.diff(result_times), 1 / 12, rtol=1e-5)
+        assert result_times[-1] == times[-1]
+        np.testing.assert_allclose(result_values[-1], values[-1], rtol=1e-6, err_msg=str(key))
+
+
+@pytest.mark.parametrize("fps", [30, 60])
+def test_resampling_does_not_add_frames(fps: float):
+    source = create_odin_file(frame_count=31)
+    assert decode_odin_file(source, animation_fps=fps) == decode_odin_file(source)
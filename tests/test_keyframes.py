@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from lib.animation.interpolation import PathInterpolation, resample
+from lib.animation.keyframes import reduce_hold_keys, reduce_keys
+
+# Tolerance of each path in the same units as --anim-tolerance
+Tolerances = {"translation": 0.01, "rotation": 0.5, "scale": 0.005}
+
+
+def create_curve(rng: np.random.Generator, path: str, count: int) -> tuple[np.array, np.array]:
+    """Returns key times and values of smooth curve with small noise, times are not uniform"""
+    times = np.cumsum(rng.uniform(0.01, 0.05, size=count)).astype(np.float32)
+    phase = rng.random(3) * np.pi
+    curve = np.sin(times[:, None] * np.array([0.5, 0.7, 1.1]) + phase) + rng.normal(scale=1e-4, size=(count, 3))
+
+    match path:
+        case "translation":
+            values = curve * 10.0
+        case "rotation":
+            values = np.concatenate([np.sin(curve / 2), np.cos(curve[:, :1] / 2)], axis=1)
+            values /= np.linalg.norm(values, axis=1, keepdims=True)
+        case _:
+            values = 1.0 + curve * 0.5
+
+    return times, values.astype(np.float32)
+
+
+def reconstruct(times: np.array, values: np.array, keys: np.array, path: str) -> np.array:
+    """Samples curve of kept keys at times of all source keys"""
+    positions = np.interp(times, times[keys], np.arange(len(keys), dtype=np.float64))
+    return resample(values[keys], positions, PathInterpolation[path])
+
+
+def get_error(path: str, value: np.array, reference: np.array) -> np.array:
+    match path:
+        case "translation":
+            return np.linalg.norm(value - reference, axis=1)
+        case "rotation":
+            value = value / np.linalg.norm(value, axis=1, keepdims=True)
+            reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+            return np.degrees(2.0 * np.arccos(np.clip(np.abs((value * reference).sum(axis=1)), 0.0, 1.0)))
+        case _:
+            return np.max(np.abs(value - reference) / np.abs(reference), axis=1)
+
+
+@pytest.mark.parametrize("path", Tolerances.keys())
+def test_reduced_curves_stay_within_tolerance(path: str):
+    rng = np.random.default_rng(len(path))
+    curves = [create_curve(rng, path, count) for count in (200, 2, 57, 120)]
+    tolerance = Tolerances[path]
+
+    kept_keys, max_error = reduce_keys(curves, path, tolerance)
+
+    assert len(kept_keys) == len(curves)
+    assert max_error <= tolerance
+    for (times, values), keys in zip(curves, kept_keys):
+        assert keys[0] == 0 and keys[-1] == len(times) - 1
+        assert (np.diff(keys) > 0).all()
+
+        errors = get_error(path, reconstruct(times, values, keys, path), values.astype(np.float64))
+        assert errors.max() <= tolerance * (1 + 1e-6)
+
+    # Smooth curves need only part of keys
+    assert sum(len(keys) for keys in kept_keys) < sum(len(times) for times, _ in curves) / 2
+
+
+def test_linear_curves_collapse_to_endpoints():
+    times = np.linspace(0.0, 2.0, 30)
+    translation = np.linspace([0.0, 1.0, -2.0], [4.0, -1.0, 3.0], 30)
+    scale = np.full((30, 3), 2.5)
+
+    # Rotation around single axis with constant speed
+    angle = np.linspace(0.0, 2.0, 30)
+    rotation = np.stack([np.sin(angle / 2), np.zeros(30), np.zeros(30), np.cos(angle / 2)], axis=1)
+
+    for path, values in [("translation", translation), ("scale", scale), ("rotation", rotation)]:
+        kept_keys, max_error = reduce_keys([(times, values)], path, 1e-4)
+        np.testing.assert_array_equal(kept_keys[0], [0, 29], err_msg=path)
+        assert max_error <= 1e-4
+
+
+def test_hold_runs_collapse_to_endpoints():
+    frames = np.array([0, 1, 2, 3, 5, 6, 7, 9])
+    values = np.zeros((10, 3))
+    values[3:7] = 1.0
+    values[7:] = 2.0
+
+    # Every run of equal keys keeps its first and last key so interpolation holds value between them
+    np.testing.assert_array_equal(reduce_hold_keys(frames, values), [0, 2, 3, 6, 7, 9])
+    np.testing.assert_array_equal(reduce_hold_keys(frames[:2], values), [0, 1])
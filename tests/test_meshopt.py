@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from lib.meshopt import decode_index_sequence, decode_vertex_buffer
+from tests.synthetic import create_odin_file, decode_odin_file
+
+
+@pytest.mark.parametrize("options", [{}, {"quantize": True}, {"optimize": True}, {"stream": True}])
+def test_compressed_views_decode_to_uncompressed_data(options: dict):
+    source = create_odin_file(frame_count=31)
+    gltf, binary = decode_odin_file(source, **options)
+    compressed_gltf, compressed_binary = decode_odin_file(source, meshopt=True, **options)
+
+    assert len(gltf["bufferViews"]) == len(compressed_gltf["bufferViews"])
+
+    modes = set()
+    for view, compressed_view in zip(gltf["bufferViews"], compressed_gltf["bufferViews"]):
+        offset = view.get("byteOffset", 0)
+        expected = binary[offset:offset + view["byteLength"]]
+
+        if "extensions" not in compressed_view:
+            offset = compressed_view.get("byteOffset", 0)
+            assert compressed_binary[offset:offset + compressed_view["byteLength"]] == expected
+            continue
+
+        meshopt: dict = compressed_view["extensions"]["EXT_meshopt_compression"]
+        offset = meshopt.get("byteOffset", 0)
+        data = compressed_binary[offset:offset + meshopt["byteLength"]]
+
+        if meshopt["mode"] == "INDICES":
+            dtype = np.uint16 if meshopt["byteStride"] == 2 else np.uint32
+            decoded = decode_index_sequence(data, meshopt["count"]).astype(dtype).tobytes()
+        else:
+            decoded = decode_vertex_buffer(data, meshopt["count"], meshopt["byteStride"])
+
+        assert compressed_view["byteLength"] == view["byteLength"]
+        assert decoded == expected
+        modes.add(meshopt["mode"])
+
+    assert modes == {"ATTRIBUTES", "INDICES"}
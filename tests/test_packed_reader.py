@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from lib.animation import OdinAnimation
+from lib.animation.flags import OdinAnimationFlags
+from lib.animation.packedReader import OdinPackedReader
+from tests.reference import scalar_denormalize_transforms
+from tests.synthetic import create_mixed_packed_clip
+
+
+def create_node(frame_count: int, seed: int) -> tuple:
+    """Returns base transform as (1, ) float32 arrays with multipliers and normalized values of node, extreme values included"""
+    rng = np.random.default_rng(seed)
+    base = [np.array([value], dtype=np.float32) for value in rng.normal(scale=10.0, size=10)]
+    multiplier = (np.array([rng.random() * 0.01], dtype=np.float32),
+                  np.array([rng.random() * 0.001], dtype=np.float32))
+
+    normalized = rng.integers(-32768, 32768, size=(10, frame_count)).astype(np.int16)
+    normalized[:, 0] = -32768
+    normalized[:, 1] = 32767
+
+    return multiplier, base[0:3], base[3:7], base[7:10], normalized[0:3], normalized[3:7], normalized[7:10]
+
+
+# Scalar loop converts (1, ) arrays to floats the same way as it did before
+@pytest.mark.filterwarnings("ignore:Conversion of an array with ndim > 0 to a scalar:DeprecationWarning")
+@pytest.mark.parametrize("flags", range(32))
+def test_denormalize_transforms_matches_scalar_loop(flags: int):
+    frame_count = 300
+    node = create_node(frame_count, flags)
+    expected = scalar_denormalize_transforms(frame_count, OdinAnimationFlags(flags), *node)
+
+    result = OdinPackedReader.denormalize_transforms(None, frame_count, OdinAnimationFlags(flags), *node)
+
+    assert result.dtype == np.float32
+    np.testing.assert_array_equal(result.view(np.uint32), expected.view(np.uint32))
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("padding", [0, 6])
+def test_mixed_frametime_layout(lazy: bool, padding: int):
+    source, descriptor, expected = create_mixed_packed_clip(padding)
+    reader = OdinAnimation.Create(source, descriptor, lazy=lazy)
+
+    assert reader.used_nodes == [1, 2, 3, 4, 5]
+    for node_index, node in enumerate(expected):
+        translation, rotation, scale = reader.get_node_data(node_index)
+        np.testing.assert_allclose(translation, node["translation"], rtol=1e-6, err_msg=str(node_index))
+        np.testing.assert_allclose(rotation, node["rotation"], rtol=1e-6, err_msg=str(node_index))
+        np.testing.assert_allclose(scale, node["scale"], rtol=1e-6, err_msg=str(node_index))
+
+        times = reader.get_node_frame_times(node_index)
+        if node["times"] is None:
+            assert times is None
+        else:
+            np.testing.assert_array_equal(times, node["times"])
+
+
+def test_short_data_is_rejected():
+    source, descriptor, _ = create_mixed_packed_clip()
+    source.accessors[0] = source.accessors[0][:-1]
+
+    with pytest.raises(Exception, match="Animation nodes"):
+        OdinAnimation.Create(source, descriptor)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from lib.animation import OdinAnimation
+from tests.synthetic import create_mixed_packed_clip
+
+
+def get_key_times(reader, node_index: int) -> np.array:
+    times = reader.get_node_frame_times(node_index)
+    if times is None:
+        times = np.arange(reader.get_node_keyframe_count(node_index)) * reader.frame_spf
+
+    return np.asarray(times, dtype=np.float64)
+
+
+def normalize(values: np.array) -> np.array:
+    return values / np.linalg.norm(values, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_sample_at_key_times_returns_node_data(lazy: bool):
+    source, descriptor, _ = create_mixed_packed_clip()
+    reader = OdinAnimation.Create(source, descriptor, lazy=lazy)
+
+    for node_index in range(len(reader.used_nodes)):
+        translation, rotation, scale = reader.sample(get_key_times(reader, node_index), [node_index])
+        expected_translation, expected_rotation, expected_scale = reader.get_node_data(node_index)
+
+        np.testing.assert_array_equal(translation[0], expected_translation, err_msg=str(node_index))
+        np.testing.assert_allclose(rotation[0], normalize(expected_rotation), rtol=1e-5, atol=1e-6, err_msg=str(node_index))
+        np.testing.assert_array_equal(scale[0], expected_scale, err_msg=str(node_index))
+
+
+def test_sample_between_keys_interpolates():
+    source, descriptor, _ = create_mixed_packed_clip()
+    reader = OdinAnimation.Create(source, descriptor)
+
+    for node_index in range(len(reader.used_nodes)):
+        key_times = get_key_times(reader, node_index)
+        translation, rotation, scale = reader.sample((key_times[1:] + key_times[:-1]) / 2, [node_index])
+        (translation_start, translation_end), (rotation_start, rotation_end), (scale_start, scale_end) = [
+            (values[:-1], values[1:]) for values in reader.get_node_data(node_index)]
+
+        np.testing.assert_allclose(translation[0], (translation_start + translation_end) / 2, rtol=1e-6, err_msg=str(node_index))
+        np.testing.assert_allclose(scale[0], (scale_start + scale_end) / 2, rtol=1e-6, err_msg=str(node_index))
+
+        # Spherical midpoint is direction of quaternions sum, taking the shortest path
+        sign = np.where((rotation_start * rotation_end).sum(axis=1, keepdims=True) < 0, -1.0, 1.0)
+        np.testing.assert_allclose(rotation[0], normalize(rotation_start + rotation_end * sign), rtol=1e-5, atol=1e-6, err_msg=str(node_index))
+
+
+def test_sample_clamps_times_outside_of_clip():
+    source, descriptor, _ = create_mixed_packed_clip()
+    reader = OdinAnimation.Create(source, descriptor)
+
+    translation, _, _ = reader.sample([-1.0, 100.0])
+    for node_index in range(len(reader.used_nodes)):
+        node_translation = reader.get_node_data(node_index)[0]
+        np.testing.assert_array_equal(translation[node_index], node_translation[[0, -1]], err_msg=str(node_index))
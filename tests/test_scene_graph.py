@@ -0,0 +1,30 @@
+from lib.scene_graph import SceneGraph
+
+
+def odin_child(parent: int) -> dict:
+    return {"extensions": {"SC_odin_format": {"parent": parent}}}
+
+
+def test_children_keep_listed_order():
+    nodes = [{"children": [3, 1]}, {}, odin_child(1), {}]
+    graph = SceneGraph.from_odin_nodes(nodes)
+
+    assert graph.get_children(0).tolist() == [3, 1]
+    assert graph.get_children(1).tolist() == [2]
+    assert graph.roots.tolist() == [0]
+    assert graph.collect_subtrees([0]).tolist() == [3, 2, 1, 0]
+
+
+def test_odin_children_follow_listed_children():
+    nodes = [{"children": [3, 1]}, {"children": [4]}, odin_child(1), {}, {}]
+    graph = SceneGraph.from_odin_nodes(nodes)
+
+    assert graph.get_children(1).tolist() == [4, 2]
+    assert graph.collect_subtrees([0]).tolist() == [3, 4, 2, 1, 0]
+
+
+def test_overlapping_subtrees_are_listed_once():
+    nodes = [{"children": [2, 1]}, {"children": [3]}, {}, {}]
+    graph = SceneGraph.from_odin_nodes(nodes)
+
+    assert graph.collect_subtrees([1, 0]).tolist() == [3, 1, 2, 0]